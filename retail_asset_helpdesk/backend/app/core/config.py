@@ -21,7 +21,26 @@ class Settings(BaseSettings):
     # Qdrant
     QDRANT_HOST: str = "qdrant"
     QDRANT_PORT: int = 6333
-    QDRANT_COLLECTION: str = "retail_assets_docs"
+    QDRANT_COLLECTION: str = "retail_assets_docs"  # Alias for the live versioned collection
+    REINDEX_DROP_PREVIOUS: bool = True  # Delete the old collection after a reindex swaps the alias
+    
+    # Qdrant collection tuning (applied at creation and migrated on startup)
+    QDRANT_QUANTIZATION: str = "none"  # "none" or "int8" scalar quantization
+    QDRANT_QUANTIZATION_QUANTILE: float = 0.99
+    QDRANT_QUANTIZATION_ALWAYS_RAM: bool = True  # Keep quantized vectors in RAM even if originals are on disk
+    QDRANT_RESCORE: bool = True  # Re-rank quantized candidates with the original vectors
+    QDRANT_OVERSAMPLING: float = 2.0  # Candidates fetched per result before rescoring
+    QDRANT_HNSW_M: int = 16
+    QDRANT_HNSW_EF_CONSTRUCT: int = 100
+    QDRANT_HNSW_EF: int = 0  # Search-time ef (0 = Qdrant default)
+    QDRANT_VECTORS_ON_DISK: bool = False  # Memory-map original vectors from disk
+    QDRANT_PAYLOAD_ON_DISK: bool = False  # Keep payloads (chunk text) on disk; indexed fields stay in RAM
+    
+    # Local vector index
+    VECTOR_BACKEND: str = "qdrant"  # "qdrant" or "local" (in-process memory-mapped index, no server)
+    LOCAL_INDEX_FALLBACK: bool = False  # Mirror Qdrant locally and search it while Qdrant is down
+    LOCAL_INDEX_DIR: str = "/app/.cache/vector_index"
+    LOCAL_INDEX_DTYPE: str = "float32"  # "float32" or "int8" (per-row scaled)
     
     # OpenAI
     OPENAI_API_KEY: str = ""
@@ -31,10 +50,82 @@ class Settings(BaseSettings):
     DOCS_FOLDER: str = "/app/docs"
     CHUNK_SIZE: int = 1000
     CHUNK_OVERLAP: int = 200
+    CHUNK_SIZE_UNIT: str = "chars"  # "chars" or "tokens" (CHUNK_SIZE/CHUNK_OVERLAP in LLM tokens)
+    
+    # Context packing
+    CONTEXT_TOKEN_BUDGET: int = 2000  # Max documentation tokens sent to the LLM per question
+    CONTEXT_DEDUP_THRESHOLD: float = 0.9  # Shingle similarity at which passages count as duplicates
+    
+    # Local state (manifests and caches)
+    CACHE_DIR: str = "/app/.cache"
+    INGEST_MANIFEST_PATH: str = "/app/.cache/ingest_manifest.json"
+    EXTRACTION_CACHE_MAX_MB: int = 1024  # Extracted page text keyed by file content (0 disables)
+    EMBEDDING_STORE_MAX_MB: int = 2048  # Chunk vectors keyed by text and model (0 disables)
+    
+    # Ingestion pipeline
+    INGEST_WORKERS: int = 0  # Extraction processes (0 = one per CPU)
+    INGEST_FILE_TIMEOUT_SECONDS: float = 120.0  # Per-file extraction timeout
+    INGEST_EMBED_BATCH_SIZE: int = 256  # Chunks per embedding call, across documents
+    INGEST_UPSERT_BATCH_SIZE: int = 100
+    INGEST_UPSERT_WORKERS: int = 4
+    INGEST_QUEUE_SIZE: int = 8  # Extracted documents buffered ahead of embedding
+    INGEST_REPLACE_CHANGED: bool = True  # Re-ingesting a changed file replaces its old chunks
+    
+    # Snapshots (python -m scripts.snapshot, /snapshots endpoints)
+    SNAPSHOT_DIR: str = "/app/snapshots"
+    SNAPSHOT_UPLOAD_BATCH_SIZE: int = 1000  # Points per upload request on import
+    SNAPSHOT_UPLOAD_PARALLEL: int = 4  # Upload processes on import
+    
+    # Docs folder watcher
+    DOCS_WATCH_ENABLED: bool = False  # Auto-ingest files added to DOCS_FOLDER
+    DOCS_WATCH_DEBOUNCE_SECONDS: float = 5.0  # Quiet period before changes are ingested
+    DOCS_WATCH_POLL_INTERVAL_SECONDS: float = 10.0  # Used when watchdog/inotify is unavailable
+    
+    # Startup
+    WARMUP_ENABLED: bool = True  # Load the model and run a dummy search in the background at startup
+    STARTUP_RETRY_SECONDS: float = 5.0  # Delay between Qdrant connection attempts during warmup
+    WARMUP_ATTEMPTS: int = 3  # Warmup tries before reporting ready with the error
+    
+    # Dependency resilience
+    QDRANT_TIMEOUT_SECONDS: float = 5.0
+    QDRANT_READ_RETRIES: int = 2  # Extra attempts for idempotent Qdrant reads
+    RETRY_BASE_DELAY_SECONDS: float = 0.1  # Jittered exponential backoff between retries
+    RETRY_MAX_DELAY_SECONDS: float = 1.0
+    BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures that open a circuit (0 disables)
+    BREAKER_RESET_SECONDS: float = 30.0  # How long an open circuit fails fast before a trial call
+    RECONNECT_INTERVAL_SECONDS: float = 30.0  # Min delay between background Qdrant reconnects
+    OPENAI_TIMEOUT_SECONDS: float = 30.0
+    OPENAI_MAX_RETRIES: int = 1  # SDK-level retries per OpenAI call
     
     # Embedding
     EMBEDDING_MODEL: str = "all-MiniLM-L6-v2"
     EMBEDDING_DIMENSION: int = 384
+    EMBEDDING_BACKEND: str = "sentence-transformers"  # "sentence-transformers" or "onnx"
+    ONNX_MODEL_DIR: str = "/app/.cache/onnx/all-MiniLM-L6-v2"  # Output of scripts/embedding_onnx.py export
+    ONNX_QUANTIZED: bool = True  # Use the int8 dynamically quantized model
+    ONNX_THREADS: int = 0  # ONNX Runtime intra-op threads (0 = one per core)
+    ONNX_MAX_LENGTH: int = 256  # Token limit, matching the model's max_seq_length
+    ONNX_NORMALIZE: bool = True  # L2-normalize like the sentence-transformers Normalize layer
+    EMBEDDING_WORKERS: int = 2
+    EMBEDDING_BATCH_MAX_SIZE: int = 32  # Max concurrent queries encoded together
+    EMBEDDING_BATCH_MAX_WAIT_MS: float = 5.0  # How long to wait for a batch to fill
+    EMBEDDING_CACHE_SIZE: int = 10000  # Cached query vectors (0 disables)
+    EMBEDDING_CACHE_TTL_SECONDS: float = 86400.0
+    
+    # Answer cache
+    ANSWER_CACHE_SIZE: int = 1000  # Cached LLM answers (0 disables)
+    ANSWER_CACHE_TTL_SECONDS: float = 3600.0
+    ANSWER_CACHE_SIMILARITY_THRESHOLD: float = 0.95  # Min cosine similarity for a hit
+    
+    # Exact-match code index
+    CODE_INDEX_ENABLED: bool = True  # Look up error codes / part numbers in queries exactly
+    CODE_INDEX_MAX_HITS: int = 3  # Exact-hit chunks placed ahead of vector results
+    CODE_LOOKUP_CACHE_SIZE: int = 1000  # Cached exact lookups (0 disables)
+    
+    # Request path
+    RAG_ASYNC_MODE: bool = True  # Use async Qdrant/OpenAI clients in /query and /search
+    BATCH_MAX_ITEMS: int = 500  # Max questions per /search/batch or /query/batch call
+    BATCH_LLM_CONCURRENCY: int = 8  # Concurrent LLM calls per /query/batch call
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,19 @@
+from fastapi import Request
+
+from app.services.document_processor import DocumentProcessor
+from app.services.ingest_jobs import IngestJobManager
+from app.services.qdrant_service import QdrantRAGService
+
+
+# Services are built once in the app lifespan (see app.main) and kept on app.state
+
+def get_doc_processor(request: Request) -> DocumentProcessor:
+    return request.app.state.doc_processor
+
+
+def get_rag_service(request: Request) -> QdrantRAGService:
+    return request.app.state.rag_service
+
+
+def get_ingest_jobs(request: Request) -> IngestJobManager:
+    return request.app.state.ingest_jobs
@@ -1,8 +1,72 @@
+import asyncio
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 
 from app.core.config import settings
 from app.routers import health_router, assets_router, rag_router
+from app.services.document_processor import DocumentProcessor
+from app.services.ingest_manifest import IngestManifest
+from app.services.qdrant_service import QdrantRAGService
+from app.services.ingest_pipeline import IngestPipeline
+from app.services.ingest_jobs import IngestJobManager
+from app.services.docs_watcher import DocsWatcher
+
+
+async def warm_up(app: FastAPI):
+    """Connect to Qdrant (retrying until it is reachable), then warm up the model."""
+    rag_service = app.state.rag_service
+    
+    while not rag_service.is_available():
+        if await run_in_threadpool(rag_service.connect):
+            break
+        await asyncio.sleep(settings.STARTUP_RETRY_SECONDS)
+    
+    if settings.WARMUP_ENABLED:
+        for attempt in range(1, settings.WARMUP_ATTEMPTS + 1):
+            try:
+                await run_in_threadpool(rag_service.warmup)
+                break
+            except Exception as e:
+                print(f"Warmup attempt {attempt} failed: {e}")
+                if attempt == settings.WARMUP_ATTEMPTS:
+                    # Queries may well work; don't hold readiness back forever
+                    rag_service.record_warmup_failure(e)
+                else:
+                    await asyncio.sleep(settings.STARTUP_RETRY_SECONDS)
+    
+    if settings.DOCS_WATCH_ENABLED:
+        app.state.docs_watcher.start()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build services, warm them up in the background, and clean up on shutdown."""
+    print(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
+    print(f"Debug mode: {settings.DEBUG}")
+    print(f"Qdrant: {settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
+    
+    # Construction is cheap; connecting and loading the model happen in warm_up
+    doc_processor = DocumentProcessor(manifest=IngestManifest(settings.INGEST_MANIFEST_PATH))
+    rag_service = QdrantRAGService(connect=False)
+    ingest_pipeline = IngestPipeline(doc_processor, rag_service)
+    ingest_jobs = IngestJobManager(ingest_pipeline, doc_processor)
+    
+    app.state.doc_processor = doc_processor
+    app.state.rag_service = rag_service
+    app.state.ingest_jobs = ingest_jobs
+    app.state.docs_watcher = DocsWatcher(doc_processor, rag_service, ingest_jobs)
+    
+    warmup_task = asyncio.create_task(warm_up(app))
+    
+    yield
+    
+    print("Shutting down...")
+    warmup_task.cancel()
+    app.state.docs_watcher.stop()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
@@ -10,6 +74,7 @@ app = FastAPI(
     version=settings.VERSION,
     docs_url="/docs",
     redoc_url="/redoc",
+    lifespan=lifespan,
 )
 
 # CORS Middleware
@@ -25,17 +90,3 @@ app.add_middleware(
 app.include_router(health_router)
 app.include_router(assets_router)
 app.include_router(rag_router)
-
-
-@app.on_event("startup")
-async def startup_event():
-    """Initialize services on startup."""
-    print(f"Starting {settings.PROJECT_NAME} v{settings.VERSION}")
-    print(f"Debug mode: {settings.DEBUG}")
-    print(f"Qdrant: {settings.QDRANT_HOST}:{settings.QDRANT_PORT}")
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup on shutdown."""
-    print("Shutting down...")
\ No newline at end of file
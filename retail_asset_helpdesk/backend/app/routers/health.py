@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+
+from app.core.dependencies import get_rag_service
+from app.services.qdrant_service import QdrantRAGService
 
 router = APIRouter()
 
@@ -12,6 +16,16 @@ async def health_check():
     }
 
 
+@router.get("/ready")
+async def readiness_check(rag_service: QdrantRAGService = Depends(get_rag_service)):
+    """Readiness check: 200 once Qdrant is connected and the model is warm, else 503."""
+    readiness = rag_service.get_readiness()
+    return JSONResponse(
+        status_code=200 if readiness["ready"] else 503,
+        content=readiness
+    )
+
+
 @router.get("/")
 async def root():
     """Root endpoint."""
@@ -19,4 +33,4 @@ async def root():
         "message": "Welcome to the Retail Asset Helpdesk API",
         "docs": "/docs",
         "health": "/health"
-    }
\ No newline at end of file
+    }
@@ -1,85 +1,191 @@
 from typing import List
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.schemas.rag import (
+    BatchQueryItem,
+    BatchQueryRequest,
+    BatchSearchItem,
+    BatchSearchRequest,
     IngestStatus,
-    IngestResponse,
+    IngestJobStatus,
     QueryRequest,
     QueryResponse,
     SearchRequest,
     SearchResult,
+    SnapshotExportRequest,
+    SnapshotImportRequest,
+    SnapshotInfo,
     StatsResponse,
     FileStatus
 )
 from app.schemas.chat import SummarizeRequest, SummarizeResponse
+from app.core.config import settings
+from app.core.dependencies import get_doc_processor, get_ingest_jobs, get_rag_service
 from app.services.document_processor import DocumentProcessor
 from app.services.qdrant_service import QdrantRAGService
-from app.utils.helpers import extract_category_from_filename
+from app.services.ingest_jobs import IngestJobManager
+from app.services.reindex import Reindexer
+from app.services.resilience import CircuitOpenError
+from app.services.snapshots import SnapshotManager
+from app.utils.helpers import extract_category_from_filename, format_sse
 
 router = APIRouter(tags=["RAG"])
 
-# Initialize services
-doc_processor = DocumentProcessor()
-rag_service = QdrantRAGService()
 
+@router.post("/ingest", response_model=IngestJobStatus, status_code=202)
+async def ingest_documents(ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)):
+    """Start a background job ingesting new documents from the docs folder.
+    
+    Returns immediately; poll /ingest/jobs/{job_id} for progress.
+    """
+    job, started = ingest_jobs.start()
+    if not started:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingest job {job.job_id} is already running"
+        )
+    return IngestJobStatus(**job.to_dict())
 
-@router.post("/ingest", response_model=IngestResponse)
-async def ingest_documents():
-    """Ingest new documents from the docs folder."""
-    documents = doc_processor.get_all_documents()
+
+@router.post("/reindex", response_model=IngestJobStatus, status_code=202)
+async def reindex_documents(
+    doc_processor: DocumentProcessor = Depends(get_doc_processor),
+    rag_service: QdrantRAGService = Depends(get_rag_service),
+    ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)
+):
+    """Start a background job rebuilding the collection with the current settings.
     
-    new_files = []
-    skipped_files = []
-    total_chunks = 0
+    The live collection keeps serving queries until the new one is complete
+    and verified; the collection alias then switches over atomically. Poll
+    /ingest/jobs/{job_id} for progress.
     
-    for doc_path in documents:
-        # Use filename+hash to allow same content with different filenames
-        file_hash = doc_processor.get_file_hash(doc_path)
-        file_key = f"{doc_path.name}:{file_hash}"
-        
-        if rag_service.is_file_ingested(file_key):
-            skipped_files.append(doc_path.name)
-            continue
-        
-        chunks = doc_processor.process_document(doc_path)
-        
-        if chunks:
-            # Update chunks to use the file_key
-            for chunk in chunks:
-                chunk['file_hash'] = file_key
-            ingested = rag_service.ingest_chunks(chunks)
-            total_chunks += ingested
-            new_files.append(doc_path.name)
-        else:
-            skipped_files.append(f"{doc_path.name} (no text extracted)")
-    
-    return IngestResponse(
-        message="Ingestion complete",
-        files_processed=len(new_files),
-        chunks_ingested=total_chunks,
-        new_files=new_files,
-        skipped_files=skipped_files
+    The new collection is embedded with the model this process is running,
+    so this covers chunking, quantization and storage changes without
+    downtime. Switching EMBEDDING_MODEL needs a restart first, and queries
+    against the old collection are unreliable until this job completes.
+    """
+    if rag_service.qdrant is None:
+        raise HTTPException(status_code=503, detail="Qdrant service not available")
+    
+    reindexer = Reindexer(doc_processor, rag_service)
+    job, started = ingest_jobs.start(kind="reindex", task=reindexer.run)
+    if not started:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingest job {job.job_id} is already running"
+        )
+    return IngestJobStatus(**job.to_dict())
+
+
+@router.get("/snapshots", response_model=List[SnapshotInfo])
+def list_snapshots(rag_service: QdrantRAGService = Depends(get_rag_service)):
+    """List corpus snapshots available for import, newest first."""
+    return [SnapshotInfo(**snapshot) for snapshot in SnapshotManager(rag_service).list_snapshots()]
+
+
+@router.post("/snapshots/export", response_model=IngestJobStatus, status_code=202)
+async def export_snapshot(
+    request: SnapshotExportRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service),
+    ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)
+):
+    """Start a background job writing vectors, payloads and the file registry to a snapshot."""
+    if rag_service.qdrant is None:
+        raise HTTPException(status_code=503, detail="Qdrant service not available")
+    
+    snapshots = SnapshotManager(rag_service)
+    if request.name is not None:
+        try:
+            if snapshots.path_for(request.name).exists():
+                raise HTTPException(status_code=409, detail=f"Snapshot {request.name} already exists")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    job, started = ingest_jobs.start(
+        kind="snapshot_export",
+        task=lambda run: snapshots.export(request.name, run=run)
     )
+    if not started:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingest job {job.job_id} is already running"
+        )
+    return IngestJobStatus(**job.to_dict())
+
+
+@router.post("/snapshots/import", response_model=IngestJobStatus, status_code=202)
+async def import_snapshot(
+    request: SnapshotImportRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service),
+    ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)
+):
+    """Start a background job loading a snapshot into a new collection.
+    
+    The current collection keeps serving until the import is complete; the
+    collection alias then switches over atomically.
+    """
+    if rag_service.qdrant is None:
+        raise HTTPException(status_code=503, detail="Qdrant service not available")
+    
+    snapshots = SnapshotManager(rag_service)
+    try:
+        if not (snapshots.path_for(request.name) / "manifest.json").exists():
+            raise HTTPException(status_code=404, detail=f"Snapshot not found: {request.name}")
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    job, started = ingest_jobs.start(
+        kind="snapshot_import",
+        task=lambda run: snapshots.import_snapshot(request.name, force=request.force, run=run)
+    )
+    if not started:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingest job {job.job_id} is already running"
+        )
+    return IngestJobStatus(**job.to_dict())
+
+
+@router.get("/ingest/jobs", response_model=List[IngestJobStatus])
+async def list_ingest_jobs(ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)):
+    """List recent ingestion jobs, newest first."""
+    return [IngestJobStatus(**job.to_dict()) for job in ingest_jobs.list_jobs()]
+
+
+@router.get("/ingest/jobs/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(job_id: str, ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)):
+    """Get progress of an ingestion job."""
+    job = ingest_jobs.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Ingest job not found")
+    return IngestJobStatus(**job.to_dict())
 
 
 @router.get("/ingest/status", response_model=IngestStatus)
-async def get_ingest_status():
+def get_ingest_status(
+    doc_processor: DocumentProcessor = Depends(get_doc_processor),
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
     """Get current ingestion status."""
     documents = doc_processor.get_all_documents()
     ingested_hashes = rag_service.get_ingested_files()
     
     files_status = []
     for doc_path in documents:
+        filename = doc_processor.relative_name(doc_path)
         file_hash = doc_processor.get_file_hash(doc_path)
-        file_key = f"{doc_path.name}:{file_hash}"
+        file_key = f"{filename}:{file_hash}"
         asset_category = extract_category_from_filename(doc_path.name)
         
         files_status.append(FileStatus(
-            filename=doc_path.name,
+            filename=filename,
             ingested=file_key in ingested_hashes,
             asset_category=asset_category
         ))
     
+    doc_processor.save_manifest(documents)
+    
     ingested_count = sum(1 for f in files_status if f.ingested)
     
     return IngestStatus(
@@ -91,10 +197,13 @@ async def get_ingest_status():
 
 
 @router.post("/query", response_model=QueryResponse)
-async def query_documents(request: QueryRequest):
+async def query_documents(
+    request: QueryRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
     """Query the RAG system with a question."""
     try:
-        result = rag_service.query_with_llm(
+        result = await rag_service.aquery_with_llm(
             question=request.question,
             asset_category=request.asset_category,
             filename=request.filename
@@ -103,27 +212,93 @@ async def query_documents(request: QueryRequest):
             answer=result["answer"],
             sources=result["sources"]
         )
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/query/stream")
+async def query_documents_stream(
+    request: QueryRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
+    """Query the RAG system and stream the answer as Server-Sent Events.
+    
+    Emits a `sources` event first, then `token` events as the LLM generates
+    the answer, and finally a `done` event.
+    """
+    async def event_stream():
+        try:
+            async for event in rag_service.astream_query_with_llm(
+                question=request.question,
+                asset_category=request.asset_category,
+                filename=request.filename
+            ):
+                yield format_sse(event["event"], event["data"])
+        except Exception as e:
+            yield format_sse("error", str(e))
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
 @router.post("/search", response_model=List[SearchResult])
-async def search_documents(request: SearchRequest):
+async def search_documents(
+    request: SearchRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
     """Search for relevant document chunks."""
     try:
-        results = rag_service.search(
+        results = await rag_service.asearch(
             query=request.query,
             limit=request.limit,
             asset_category=request.asset_category,
             filename=request.filename
         )
         return [SearchResult(**r) for r in results]
+    except CircuitOpenError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _check_batch_size(size: int):
+    """Reject batches larger than BATCH_MAX_ITEMS."""
+    if size > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Batch of {size} exceeds the limit of {settings.BATCH_MAX_ITEMS}"
+        )
+
+
+@router.post("/search/batch", response_model=List[BatchSearchItem])
+async def search_documents_batch(
+    request: BatchSearchRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
+    """Search many queries at once; results are in request order with per-item errors."""
+    _check_batch_size(len(request.queries))
+    results = await rag_service.asearch_batch([q.model_dump() for q in request.queries])
+    return [BatchSearchItem(**r) for r in results]
+
+
+@router.post("/query/batch", response_model=List[BatchQueryItem])
+async def query_documents_batch(
+    request: BatchQueryRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
+    """Answer many questions at once; results are in request order with per-item errors."""
+    _check_batch_size(len(request.questions))
+    results = await rag_service.aquery_batch([q.model_dump() for q in request.questions])
+    return [BatchQueryItem(**r) for r in results]
+
+
 @router.get("/stats", response_model=StatsResponse)
-async def get_stats():
+def get_stats(rag_service: QdrantRAGService = Depends(get_rag_service)):
     """Get RAG system statistics."""
     stats = rag_service.get_stats()
     if "error" in stats:
@@ -131,23 +306,41 @@ async def get_stats():
     return StatsResponse(**stats)
 
 
+@router.get("/stats/cache")
+async def get_cache_stats(rag_service: QdrantRAGService = Depends(get_rag_service)):
+    """Get query cache hit/miss and batching statistics."""
+    return rag_service.get_cache_stats()
+
+
 @router.delete("/collection")
-async def delete_collection():
+def delete_collection(
+    rag_service: QdrantRAGService = Depends(get_rag_service),
+    ingest_jobs: IngestJobManager = Depends(get_ingest_jobs)
+):
     """Delete all ingested documents (reset the system)."""
-    try:
-        rag_service.delete_collection()
-        return {"message": "Collection deleted and recreated"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+    # Run as a job so no ingest, watcher or reindex job can start underneath it
+    job, started = ingest_jobs.start(kind="delete", task=lambda run: rag_service.delete_collection())
+    if not started:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Ingest job {job.job_id} is running; try again when it finishes"
+        )
+    job.wait()
+    if job.status == "failed":
+        raise HTTPException(status_code=500, detail=job.error)
+    return {"message": "Collection deleted and recreated"}
 
 
 @router.post("/summarize", response_model=SummarizeResponse)
-async def summarize_chat(request: SummarizeRequest):
+async def summarize_chat(
+    request: SummarizeRequest,
+    rag_service: QdrantRAGService = Depends(get_rag_service)
+):
     """Summarize a chat conversation."""
     if not request.messages:
         raise HTTPException(status_code=400, detail="No messages provided")
     
     messages = [{"role": m.role, "content": m.content} for m in request.messages]
-    summary = rag_service.summarize_chat(messages)
+    summary = await rag_service.asummarize_chat(messages)
     
     return SummarizeResponse(summary=summary)
\ No newline at end of file
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Optional, List
 from pydantic import BaseModel
 
@@ -15,14 +16,45 @@ class IngestStatus(BaseModel):
     files: List[FileStatus]
 
 
-class IngestResponse(BaseModel):
-    message: str
-    files_processed: int
+class IngestJobStatus(BaseModel):
+    job_id: str
+    kind: str
+    status: str  # 'pending', 'running', 'completed' or 'failed'
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    files_total: int
+    files_done: int
+    chunks_embedded: int
     chunks_ingested: int
+    chunks_per_second: float
+    elapsed_seconds: float
+    eta_seconds: Optional[float] = None
+    errors: List[str]
     new_files: List[str]
     skipped_files: List[str]
 
 
+class SnapshotExportRequest(BaseModel):
+    name: Optional[str] = None  # Defaults to "<collection>-<UTC timestamp>"
+
+
+class SnapshotImportRequest(BaseModel):
+    name: str
+    force: bool = False  # Import even if the snapshot used a different embedding model
+
+
+class SnapshotInfo(BaseModel):
+    name: str
+    created_at: datetime
+    collection: str
+    points: int
+    files: int
+    dimension: int
+    embedding_model: str
+
+
 class Source(BaseModel):
     filename: str
     doc_type: str
@@ -52,9 +84,31 @@ class SearchResult(BaseModel):
     filename: str
     asset_category: str
     score: float
+    page_start: Optional[int] = None
+    page_end: Optional[int] = None
+
+
+class BatchQueryRequest(BaseModel):
+    questions: List[QueryRequest]
+
+
+class BatchQueryItem(BaseModel):
+    answer: Optional[str] = None
+    sources: List[Source] = []
+    error: Optional[str] = None
+
+
+class BatchSearchRequest(BaseModel):
+    queries: List[SearchRequest]
+
+
+class BatchSearchItem(BaseModel):
+    results: List[SearchResult] = []
+    error: Optional[str] = None
 
 
 class StatsResponse(BaseModel):
     total_chunks: int
     total_files: int
-    collection_name: str
\ No newline at end of file
+    collection_name: str
+    collection_version: Optional[str] = None
\ No newline at end of file
@@ -0,0 +1,148 @@
+import copy
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+
+Scope = Tuple[str, str, Tuple[str, ...]]
+
+
+class AnswerCache:
+    """Semantic cache of LLM answers keyed by query embedding and search scope.
+    
+    A lookup hits when a cached query in the same filename/asset_category
+    scope, mentioning the same error codes and part numbers, has cosine
+    similarity to the new query at or above the threshold.
+    Entries are evicted LRU and expire after the TTL. `clear()` must be called
+    whenever the corpus changes; `generation` lets callers detect a clear that
+    happened while their LLM call was in flight.
+    """
+    
+    def __init__(
+        self,
+        max_size: int = 1000,
+        ttl_seconds: float = 3600.0,
+        similarity_threshold: float = 0.95
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._by_scope: Dict[Scope, Set[int]] = {}
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_scope(
+        filename: Optional[str],
+        asset_category: Optional[str],
+        codes: Iterable[str] = ()
+    ) -> Scope:
+        """Build the scope key for a query's filters and exact-match codes.
+        
+        "E23" and "E24" questions embed almost identically, so codes must
+        match exactly for one to reuse the other's answer.
+        """
+        return (filename or "", asset_category or "", tuple(sorted(set(codes))))
+    
+    def lookup(self, vector: List[float], scope: Scope) -> Optional[Dict[str, Any]]:
+        """Return the cached result for the most similar query in scope, or None."""
+        if self.max_size <= 0:
+            return None
+        
+        query = self._normalize(vector)
+        with self._lock:
+            self._expire()
+            entry_ids = list(self._by_scope.get(scope, ()))
+            if not entry_ids:
+                self.misses += 1
+                return None
+            
+            matrix = np.stack([self._entries[i]["vector"] for i in entry_ids])
+            similarities = matrix @ query
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+            
+            entry_id = entry_ids[best]
+            self._entries.move_to_end(entry_id)
+            self.hits += 1
+            return copy.deepcopy(self._entries[entry_id]["result"])
+    
+    def store(
+        self,
+        vector: List[float],
+        scope: Scope,
+        result: Dict[str, Any],
+        generation: Optional[int] = None
+    ):
+        """Cache a result, unless the cache was cleared since `generation`."""
+        if self.max_size <= 0:
+            return
+        
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            
+            entry_id = next(self._ids)
+            self._entries[entry_id] = {
+                "vector": self._normalize(vector),
+                "scope": scope,
+                "result": copy.deepcopy(result),
+                "stored_at": time.monotonic(),
+            }
+            self._by_scope.setdefault(scope, set()).add(entry_id)
+            
+            while len(self._entries) > self.max_size:
+                old_id, old_entry = self._entries.popitem(last=False)
+                self._discard_scope_id(old_entry["scope"], old_id)
+    
+    def clear(self):
+        """Drop all cached answers (call whenever the corpus changes)."""
+        with self._lock:
+            self._entries.clear()
+            self._by_scope.clear()
+            self.generation += 1
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "similarity_threshold": self.similarity_threshold,
+        }
+    
+    def _expire(self):
+        """Remove entries older than the TTL (caller holds the lock)."""
+        if not self.ttl_seconds:
+            return
+        cutoff = time.monotonic() - self.ttl_seconds
+        expired = [i for i, e in self._entries.items() if e["stored_at"] < cutoff]
+        for entry_id in expired:
+            entry = self._entries.pop(entry_id)
+            self._discard_scope_id(entry["scope"], entry_id)
+    
+    def _discard_scope_id(self, scope: Scope, entry_id: int):
+        ids = self._by_scope.get(scope)
+        if ids is not None:
+            ids.discard(entry_id)
+            if not ids:
+                del self._by_scope[scope]
+    
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm else array
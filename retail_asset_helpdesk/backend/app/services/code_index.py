@@ -0,0 +1,85 @@
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Alphanumeric tokens, optionally joined by hyphens (E23, GDM-26F, R-404A, 2231-0045)
+_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9]+(?:-[A-Za-z0-9]+)*')
+
+# Measurements and ordinals that look like codes but are not worth indexing
+_NOT_A_CODE = re.compile(
+    r'^\d+(?:V|W|KW|A|MA|HZ|MM|CM|M|KG|G|LB|LBS|OZ|L|ML|F|C|S|MIN|H|HR|HRS|PM|AM|ST|ND|RD|TH|X|PSI|BAR)$'
+)
+
+
+def extract_codes(text: str) -> List[str]:
+    """Find error codes, model and part numbers in text, uppercased and de-duplicated."""
+    codes = set()
+    for token in _TOKEN_PATTERN.findall(text):
+        if not 2 <= len(token) <= 24:
+            continue
+        has_digit = any(c.isdigit() for c in token)
+        has_letter = any(c.isalpha() for c in token)
+        # Require a digit plus a letter or hyphen: plain words and plain numbers are not codes
+        if not has_digit or not (has_letter or '-' in token):
+            continue
+        token = token.upper()
+        if _NOT_A_CODE.match(token):
+            continue
+        codes.add(token)
+    return sorted(codes)
+
+
+class CodeLookupCache:
+    """Bounded LRU cache of exact code lookups against the collection.
+    
+    Keyed by the query's codes and search scope; must be cleared whenever
+    the corpus changes.
+    """
+    
+    def __init__(self, max_size: int = 1000):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple, List[Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: Tuple) -> Optional[List[Dict[str, Any]]]:
+        """Return cached hits for a lookup, or None."""
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            hits = self._entries.get(key)
+            if hits is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return list(hits)
+    
+    def put(self, key: Tuple, hits: List[Dict[str, Any]]):
+        """Store the hits of a lookup."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = list(hits)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached lookups."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
@@ -0,0 +1,74 @@
+import time
+from typing import Dict, Optional, Set, Tuple
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+
+def collection_names(qdrant: QdrantClient) -> Tuple[Set[str], Dict[str, str]]:
+    """Get the names of real collections and a map of alias -> collection."""
+    collections = {c.name for c in qdrant.get_collections().collections}
+    aliases = {a.alias_name: a.collection_name for a in qdrant.get_aliases().aliases}
+    return collections, aliases
+
+
+def name_exists(qdrant: QdrantClient, name: str) -> bool:
+    """Check whether a collection or alias with this name exists."""
+    collections, aliases = collection_names(qdrant)
+    return name in collections or name in aliases
+
+
+def resolve(qdrant: QdrantClient, name: str) -> Optional[str]:
+    """Get the collection a name refers to (following an alias), or None."""
+    collections, aliases = collection_names(qdrant)
+    if name in aliases:
+        return aliases[name]
+    return name if name in collections else None
+
+
+def versioned_name(qdrant: QdrantClient, alias: str) -> str:
+    """Pick an unused name for a new collection to serve behind `alias`."""
+    collections, aliases = collection_names(qdrant)
+    version = int(time.time())
+    while f"{alias}_v{version}" in collections or f"{alias}_v{version}" in aliases:
+        version += 1
+    return f"{alias}_v{version}"
+
+
+def point_aliases(qdrant: QdrantClient, targets: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Atomically point each alias at its target collection.
+    
+    Returns the collection each alias referred to before. A real collection
+    still holding an alias name (created before aliases were used) has to be
+    deleted first, so that one-off migration briefly leaves the name unset.
+    """
+    collections, aliases = collection_names(qdrant)
+    previous: Dict[str, Optional[str]] = {}
+    operations = []
+    for alias, target in targets.items():
+        previous[alias] = aliases.get(alias)
+        if alias in collections:
+            print(f"Replacing collection {alias} with an alias to {target}")
+            qdrant.delete_collection(alias)
+        if alias in aliases:
+            operations.append(models.DeleteAliasOperation(
+                delete_alias=models.DeleteAlias(alias_name=alias)
+            ))
+        operations.append(models.CreateAliasOperation(
+            create_alias=models.CreateAlias(collection_name=target, alias_name=alias)
+        ))
+    
+    qdrant.update_collection_aliases(change_aliases_operations=operations)
+    return previous
+
+
+def drop(qdrant: QdrantClient, name: str):
+    """Delete a collection, or the collection behind an alias along with the alias."""
+    target = resolve(qdrant, name)
+    if target is None:
+        return
+    if target != name:
+        qdrant.update_collection_aliases(change_aliases_operations=[
+            models.DeleteAliasOperation(delete_alias=models.DeleteAlias(alias_name=name))
+        ])
+    qdrant.delete_collection(target)
@@ -0,0 +1,346 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+class ExtractionCache:
+    """Extracted page text on disk, keyed by the document's content hash.
+    
+    One gzipped JSON file per document holds its `(page, text)` pairs, so a
+    re-chunk or re-index of unchanged files skips PDF parsing. Files are
+    touched on read and the least recently used are evicted once the cache
+    grows past `max_bytes`; sizes and recency are tracked in memory, so the
+    directory is only scanned on startup. Writes are atomic, so worker
+    processes can share the directory.
+    """
+    
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._total = 0
+        self._load()
+    
+    def _load(self):
+        """Record the size of every cached file, least recently used first."""
+        entries = []
+        for path in self.directory.glob("*.json.gz"):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, name, size in sorted(entries):
+            self._entries[name] = size
+            self._total += size
+    
+    def _track(self, name: str, size: int):
+        """Mark a file most recently used (caller holds the lock)."""
+        self._total += size - self._entries.pop(name, 0)
+        self._entries[name] = size
+    
+    def _path(self, content_hash: str) -> Path:
+        return self.directory / f"{content_hash}.json.gz"
+    
+    def get(self, content_hash: str) -> Optional[List[Tuple[Optional[int], str]]]:
+        """Return the cached pages of a document, or None."""
+        path = self._path(content_hash)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                pages = json.load(f)["pages"]
+            os.utime(path)
+            size = path.stat().st_size
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"Error reading extraction cache {path}: {e}")
+            return None
+        with self._lock:
+            self._track(path.name, size)
+        return [(page, text) for page, text in pages]
+    
+    def put(self, content_hash: str, pages: List[Tuple[Optional[int], str]]):
+        """Store the pages of a document, evicting old entries if over budget."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(content_hash)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=3) as f:
+                json.dump({"pages": pages}, f)
+            os.replace(tmp_path, path)
+            size = path.stat().st_size
+        except Exception as e:
+            print(f"Error writing extraction cache {path}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+        
+        with self._lock:
+            self._track(path.name, size)
+            while self._total > self.max_bytes and len(self._entries) > 1:
+                name, old_size = self._entries.popitem(last=False)
+                self._total -= old_size
+                try:
+                    (self.directory / name).unlink(missing_ok=True)
+                except OSError:
+                    pass
+
+
+class EmbeddingStore:
+    """Chunk embeddings on disk, keyed by a hash of the text and the model.
+    
+    Each `put_many` call writes one immutable segment: a float32 `.npy`
+    matrix plus a `.keys.npy` array of 16-byte keys. Segments are opened
+    memory-mapped, so lookups read only the rows they need; at most
+    `max_open_segments` maps (each holding a file descriptor) stay open.
+    An in-memory dict maps keys to (segment, row). Once more than
+    `compact_after` small segments exist their live rows are merged into
+    one, and whole segments are evicted least recently used first once the
+    store grows past `max_bytes`.
+    """
+    
+    # Segments with fewer rows than this are merged by compaction
+    SMALL_SEGMENT_ROWS = 4096
+    
+    def __init__(
+        self,
+        directory: str,
+        model_id: str,
+        dimension: int,
+        max_bytes: int,
+        max_open_segments: int = 64,
+        compact_after: int = 32
+    ):
+        self.directory = Path(directory)
+        self.model_id = model_id
+        self.dimension = dimension
+        self.max_bytes = max_bytes
+        self.max_open_segments = max_open_segments
+        self.compact_after = compact_after
+        self._lock = threading.Lock()
+        self._index: Dict[bytes, Tuple[str, int]] = {}
+        self._segment_keys: Dict[str, np.ndarray] = {}
+        self._segments: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._compacting = False
+        self.hits = 0
+        self.misses = 0
+        self.compactions = 0
+        self._load()
+    
+    def _load(self):
+        """Index the keys of every complete segment, oldest first."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        for keys_path in sorted(self.directory.glob("*.keys.npy")):
+            segment = keys_path.name[:-len(".keys.npy")]
+            try:
+                keys = np.load(keys_path)
+            except Exception as e:
+                print(f"Skipping unreadable embedding segment {segment}: {e}")
+                continue
+            try:
+                stat = self._vectors_path(segment).stat()
+            except OSError:
+                continue
+            self._add_segment(segment, keys, stat.st_size, stat.st_mtime)
+        if self._index:
+            print(f"Loaded embedding store: {len(self._index)} vectors in {len(self._segment_keys)} segments")
+    
+    def _vectors_path(self, segment: str) -> Path:
+        return self.directory / f"{segment}.npy"
+    
+    def _keys_path(self, segment: str) -> Path:
+        return self.directory / f"{segment}.keys.npy"
+    
+    def _add_segment(self, segment: str, keys: np.ndarray, size: int, last_used: float):
+        self._segment_keys[segment] = keys
+        self._sizes[segment] = size
+        self._last_used[segment] = last_used
+        for row, key in enumerate(keys):
+            self._index[key.tobytes()] = (segment, row)
+    
+    def key(self, text: str) -> bytes:
+        return hashlib.blake2b(f"{self.model_id}\0{text}".encode('utf-8'), digest_size=16).digest()
+    
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        """Return the stored vector for each text, or None where missing."""
+        results: List[Optional[np.ndarray]] = []
+        used = set()
+        with self._lock:
+            for text in texts:
+                location = self._index.get(self.key(text))
+                vector = None
+                if location is not None:
+                    segment, row = location
+                    vectors = self._open(segment)
+                    if vectors is not None:
+                        vector = np.array(vectors[row], dtype=np.float32)
+                        used.add(segment)
+                results.append(vector)
+                if vector is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+            now = time.time()
+            for segment in used:
+                self._last_used[segment] = now
+        
+        # Persist recency for eviction after a restart
+        for segment in used:
+            try:
+                os.utime(self._vectors_path(segment))
+            except OSError:
+                pass
+        return results
+    
+    def _open(self, segment: str) -> Optional[np.ndarray]:
+        """Memory-map a segment's vectors (caller holds the lock)."""
+        vectors = self._segments.get(segment)
+        if vectors is not None:
+            self._segments.move_to_end(segment)
+            return vectors
+        
+        try:
+            vectors = np.load(self._vectors_path(segment), mmap_mode='r')
+        except Exception as e:
+            print(f"Dropping unreadable embedding segment {segment}: {e}")
+            self._drop_segment(segment)
+            return None
+        self._segments[segment] = vectors
+        while len(self._segments) > self.max_open_segments:
+            # Unmapped (and its descriptor closed) once no lookup holds it
+            self._segments.popitem(last=False)
+        return vectors
+    
+    def put_many(self, texts: List[str], vectors: np.ndarray):
+        """Store vectors for texts as a new segment."""
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(texts), self.dimension)
+        if not len(texts):
+            return
+        keys = np.frombuffer(b"".join(self.key(text) for text in texts), dtype=np.uint8).reshape(-1, 16)
+        
+        segment = self._write_segment(keys, vectors)
+        if segment is None:
+            return
+        
+        with self._lock:
+            self._add_segment(segment, keys, self._vectors_path(segment).stat().st_size, time.time())
+            self._evict(keep=segment)
+        self._compact()
+    
+    def _write_segment(self, keys: np.ndarray, vectors: np.ndarray) -> Optional[str]:
+        """Write a new segment's files; returns its name, or None on failure."""
+        # Time-ordered names keep segments sortable by age across processes
+        segment = f"{time.time_ns():020d}-{os.getpid()}"
+        try:
+            self._write(self._vectors_path(segment), vectors)
+            # The keys file is written last and marks the segment complete
+            self._write(self._keys_path(segment), keys)
+        except Exception as e:
+            print(f"Error writing embedding segment {segment}: {e}")
+            self._vectors_path(segment).unlink(missing_ok=True)
+            return None
+        return segment
+    
+    def _compact(self):
+        """Merge the live rows of small segments into one once there are too many."""
+        with self._lock:
+            small = [
+                segment for segment, keys in self._segment_keys.items()
+                if len(keys) < self.SMALL_SEGMENT_ROWS
+            ]
+            if self._compacting or len(small) <= self.compact_after:
+                return
+            self._compacting = True
+            # Rows whose key was stored again later are dropped
+            live = {}
+            for segment in small:
+                keys = self._segment_keys[segment]
+                rows = [row for row, key in enumerate(keys) if self._index.get(key.tobytes()) == (segment, row)]
+                live[segment] = (keys[rows], rows)
+            last_used = max(self._last_used[segment] for segment in small)
+        
+        try:
+            parts_keys, parts_vectors, merged = [], [], []
+            for segment, (keys, rows) in live.items():
+                try:
+                    vectors = np.load(self._vectors_path(segment), mmap_mode='r')
+                    parts_vectors.append(np.array(vectors[rows], dtype=np.float32))
+                    del vectors
+                except Exception:
+                    continue
+                parts_keys.append(keys)
+                merged.append(segment)
+            if not merged:
+                return
+            
+            keys = np.concatenate(parts_keys).reshape(-1, 16)
+            segment = self._write_segment(keys, np.concatenate(parts_vectors).reshape(-1, self.dimension))
+            if segment is None:
+                return
+            
+            with self._lock:
+                self._add_segment(segment, keys, self._vectors_path(segment).stat().st_size, last_used)
+                for old in merged:
+                    self._drop_segment(old)
+                self.compactions += 1
+            print(f"Compacted {len(merged)} embedding segments into {segment} ({len(keys)} vectors)")
+        finally:
+            with self._lock:
+                self._compacting = False
+    
+    @staticmethod
+    def _write(path: Path, array: np.ndarray):
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, 'wb') as f:
+            np.save(f, array)
+        os.replace(tmp_path, path)
+    
+    def _evict(self, keep: str):
+        """Drop least recently used segments while over budget (caller holds the lock)."""
+        total = sum(self._sizes.values())
+        for segment in sorted(self._sizes, key=self._last_used.get):
+            if total <= self.max_bytes:
+                break
+            if segment == keep:
+                continue
+            total -= self._sizes[segment]
+            self._drop_segment(segment)
+    
+    def _drop_segment(self, segment: str):
+        keys = self._segment_keys.pop(segment, None)
+        self._segments.pop(segment, None)
+        self._sizes.pop(segment, None)
+        self._last_used.pop(segment, None)
+        if keys is not None:
+            for row, key in enumerate(keys):
+                if self._index.get(key.tobytes()) == (segment, row):
+                    del self._index[key.tobytes()]
+        self._vectors_path(segment).unlink(missing_ok=True)
+        self._keys_path(segment).unlink(missing_ok=True)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get store statistics."""
+        total = self.hits + self.misses
+        with self._lock:
+            size_bytes = sum(self._sizes.values())
+            return {
+                "vectors": len(self._index),
+                "segments": len(self._segment_keys),
+                "open_segments": len(self._segments),
+                "compactions": self.compactions,
+                "size_mb": round(size_bytes / (1024 * 1024), 2),
+                "max_size_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
@@ -0,0 +1,169 @@
+import re
+from typing import Any, Dict, List, Optional, Set
+
+from app.utils.tokens import CHARS_PER_TOKEN, get_encoding
+
+
+# Shortest text overlap treated as the same passage when merging neighbours
+_MIN_OVERLAP_CHARS = 20
+
+
+class ContextPacker:
+    """Assemble retrieved chunks into LLM context within a token budget.
+    
+    Neighbouring chunks of the same file version (consecutive `chunk_id` or
+    touching `start_char`/`end_char`) are merged so their overlap is sent
+    once, near-duplicate passages are dropped, and the rest is packed by
+    score until the budget is spent. The overlap is located from the
+    offsets; `max_overlap` (in characters) bounds the text search used for
+    payloads without them.
+    """
+    
+    def __init__(
+        self,
+        token_budget: int = 2000,
+        dedup_threshold: float = 0.9,
+        max_overlap: int = 200,
+        model: Optional[str] = None
+    ):
+        self.token_budget = token_budget
+        self.dedup_threshold = dedup_threshold
+        self.max_overlap = max_overlap
+        self.model = model
+    
+    @property
+    def encoding(self):
+        """Tokenizer for the model, loaded on first use."""
+        return get_encoding(self.model)
+    
+    def pack(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge, de-duplicate and budget search results; highest score first."""
+        passages = sorted(self._merge_neighbours(results), key=lambda p: p["score"], reverse=True)
+        
+        packed = []
+        shingles: List[Set[str]] = []
+        remaining = self.token_budget
+        for passage in passages:
+            passage_shingles = self._shingles(passage["text"])
+            if any(self._similarity(passage_shingles, s) >= self.dedup_threshold for s in shingles):
+                continue
+            
+            tokens = self.count_tokens(passage["text"])
+            if tokens > remaining:
+                # Always send something: trim the best passage if it alone is too long
+                if packed:
+                    continue
+                passage = {**passage, "text": self.truncate(passage["text"], remaining)}
+                tokens = remaining
+            
+            packed.append(passage)
+            shingles.append(passage_shingles)
+            remaining -= tokens
+            if remaining <= 0:
+                break
+        return packed
+    
+    def count_tokens(self, text: str) -> int:
+        encoding = self.encoding
+        if encoding is not None:
+            return len(encoding.encode(text))
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    
+    def truncate(self, text: str, tokens: int) -> str:
+        encoding = self.encoding
+        if encoding is not None:
+            return encoding.decode(encoding.encode(text)[:tokens])
+        return text[:tokens * CHARS_PER_TOKEN]
+    
+    def _merge_neighbours(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Join chunks of the same file version that are adjacent or overlap."""
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for result in results:
+            key = result.get("file_hash") or result["filename"]
+            groups.setdefault(key, []).append(result)
+        
+        merged = []
+        for chunks in groups.values():
+            chunks = sorted(chunks, key=self._position)
+            current = dict(chunks[0])
+            for chunk in chunks[1:]:
+                if self._is_neighbour(current, chunk):
+                    current = self._join(current, chunk)
+                else:
+                    merged.append(current)
+                    current = dict(chunk)
+            merged.append(current)
+        return merged
+    
+    @staticmethod
+    def _position(chunk: Dict[str, Any]):
+        return (chunk.get("start_char") or 0, chunk.get("chunk_id") or 0)
+    
+    @staticmethod
+    def _is_neighbour(current: Dict[str, Any], chunk: Dict[str, Any]) -> bool:
+        if current.get("end_char") is not None and chunk.get("start_char") is not None:
+            return chunk["start_char"] <= current["end_char"]
+        # Payloads without offsets: fall back to consecutive chunk IDs
+        if current.get("chunk_id") is not None and chunk.get("chunk_id") is not None:
+            return chunk["chunk_id"] - current["chunk_id"] == 1
+        return False
+    
+    def _join(self, current: Dict[str, Any], chunk: Dict[str, Any]) -> Dict[str, Any]:
+        overlap = self._offset_overlap(current, chunk)
+        if overlap is None:
+            overlap = self._overlap_length(current["text"], chunk["text"])
+        if overlap >= len(chunk["text"]):
+            text = current["text"]
+        elif overlap:
+            text = current["text"] + chunk["text"][overlap:]
+        else:
+            text = f"{current['text']} {chunk['text']}"
+        
+        return {
+            **current,
+            "text": text,
+            "score": max(current["score"], chunk["score"]),
+            "chunk_id": chunk.get("chunk_id"),
+            "end_char": max(current.get("end_char") or 0, chunk.get("end_char") or 0) or None,
+            "page_end": chunk.get("page_end") or current.get("page_end"),
+        }
+    
+    @staticmethod
+    def _offset_overlap(current: Dict[str, Any], chunk: Dict[str, Any]) -> Optional[int]:
+        """Characters at the start of `chunk` already in `current`, from document offsets."""
+        if current.get("end_char") is None or chunk.get("start_char") is None:
+            return None
+        if chunk.get("end_char") is not None and chunk["end_char"] <= current["end_char"]:
+            return len(chunk["text"])
+        shared = current["end_char"] - chunk["start_char"]
+        if shared <= 0:
+            return 0
+        
+        # Chunk texts are stripped, so the shared span may be off by the trimmed whitespace
+        left, right = current["text"], chunk["text"]
+        for size in (shared, shared - 1, shared - 2, shared + 1):
+            if 0 < size <= len(right) and left.endswith(right[:size]):
+                return size
+        return min(shared, len(right))
+    
+    def _overlap_length(self, left: str, right: str) -> int:
+        """Length of the longest suffix of `left` that is a prefix of `right`."""
+        longest = min(len(left), len(right), self.max_overlap + 10)
+        for size in range(longest, _MIN_OVERLAP_CHARS - 1, -1):
+            if left.endswith(right[:size]):
+                return size
+        return 0
+    
+    @staticmethod
+    def _shingles(text: str, size: int = 3) -> Set[str]:
+        words = re.findall(r'\w+', text.lower())
+        if len(words) <= size:
+            return {" ".join(words)}
+        return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+    
+    @staticmethod
+    def _similarity(a: Set[str], b: Set[str]) -> float:
+        """Jaccard similarity of two shingle sets."""
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
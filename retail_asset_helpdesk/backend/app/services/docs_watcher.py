@@ -0,0 +1,201 @@
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessor
+from app.services.ingest_jobs import IngestJobManager
+from app.services.ingest_pipeline import IngestRun
+from app.services.qdrant_service import QdrantRAGService
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    FileSystemEventHandler = object
+    Observer = None
+    WATCHDOG_AVAILABLE = False
+
+
+class _DocsEventHandler(FileSystemEventHandler):
+    """Forward filesystem events from watchdog to the watcher."""
+    
+    def __init__(self, watcher: "DocsWatcher"):
+        super().__init__()
+        self.watcher = watcher
+    
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        if event.event_type == "deleted":
+            self.watcher.note_deleted(Path(event.src_path))
+        elif event.event_type == "moved":
+            self.watcher.note_deleted(Path(event.src_path))
+            self.watcher.note_changed(Path(event.dest_path))
+        elif event.event_type in ("created", "modified", "closed"):
+            self.watcher.note_changed(Path(event.src_path))
+
+
+class DocsWatcher:
+    """Incrementally ingest documents as they land in the docs folder.
+    
+    Uses inotify through watchdog when it is installed and otherwise polls
+    the folder with `stat` calls. Events are debounced so a file that is
+    still being copied is ingested once, after it settles. Added or changed
+    files are ingested, and chunks of deleted files are removed, through
+    the ingest job manager so watcher runs never overlap other jobs.
+    """
+    
+    def __init__(
+        self,
+        doc_processor: DocumentProcessor,
+        rag_service: QdrantRAGService,
+        ingest_jobs: IngestJobManager,
+        debounce_seconds: Optional[float] = None,
+        poll_interval: Optional[float] = None
+    ):
+        self.doc_processor = doc_processor
+        self.rag_service = rag_service
+        self.ingest_jobs = ingest_jobs
+        self.debounce_seconds = debounce_seconds or settings.DOCS_WATCH_DEBOUNCE_SECONDS
+        self.poll_interval = poll_interval or settings.DOCS_WATCH_POLL_INTERVAL_SECONDS
+        
+        self._changed: Set[Path] = set()
+        self._deleted: Set[Path] = set()
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._observer = None
+        self._snapshot: Dict[str, Tuple[int, int]] = {}
+    
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._observer is not None else "polling"
+    
+    def start(self):
+        """Start watching the docs folder."""
+        if self._thread is not None:
+            return
+        
+        self.doc_processor.docs_folder.mkdir(parents=True, exist_ok=True)
+        self._snapshot = self._scan()
+        
+        if WATCHDOG_AVAILABLE:
+            try:
+                self._observer = Observer()
+                self._observer.schedule(
+                    _DocsEventHandler(self),
+                    str(self.doc_processor.docs_folder),
+                    recursive=True
+                )
+                self._observer.start()
+            except Exception as e:
+                print(f"File watcher unavailable, falling back to polling: {e}")
+                self._observer = None
+        
+        self._thread = threading.Thread(target=self._loop, name="docs-watcher", daemon=True)
+        self._thread.start()
+        print(f"Watching {self.doc_processor.docs_folder} for changes ({self.mode})")
+    
+    def stop(self):
+        """Stop watching."""
+        self._stop.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+            self._observer = None
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def note_changed(self, path: Path):
+        """Record an added or modified file."""
+        if not self.doc_processor.is_supported(path):
+            return
+        with self._lock:
+            self._deleted.discard(path)
+            self._changed.add(path)
+            self._last_event = time.monotonic()
+    
+    def note_deleted(self, path: Path):
+        """Record a removed file."""
+        if not self.doc_processor.is_supported(path):
+            return
+        with self._lock:
+            self._changed.discard(path)
+            self._deleted.add(path)
+            self._last_event = time.monotonic()
+    
+    def _loop(self):
+        tick = 1.0 if self._observer is not None else min(1.0, self.poll_interval)
+        next_poll = time.monotonic() + self.poll_interval
+        
+        while not self._stop.wait(tick):
+            if self._observer is None and time.monotonic() >= next_poll:
+                self._poll()
+                next_poll = time.monotonic() + self.poll_interval
+            
+            with self._lock:
+                settled = time.monotonic() - self._last_event >= self.debounce_seconds
+                has_pending = bool(self._changed or self._deleted)
+            if has_pending and settled:
+                self._flush()
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        """Collect (size, mtime) for supported files using stat only."""
+        snapshot = {}
+        for root, _, files in os.walk(self.doc_processor.docs_folder):
+            for name in files:
+                path = Path(root) / name
+                if not self.doc_processor.is_supported(path):
+                    continue
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                snapshot[str(path)] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+    
+    def _poll(self):
+        """Diff the folder against the previous snapshot."""
+        snapshot = self._scan()
+        for path, signature in snapshot.items():
+            if self._snapshot.get(path) != signature:
+                self.note_changed(Path(path))
+        for path in self._snapshot.keys() - snapshot.keys():
+            self.note_deleted(Path(path))
+        self._snapshot = snapshot
+    
+    def _flush(self):
+        """Hand settled changes to the job manager as one watch job."""
+        with self._lock:
+            changed, self._changed = self._changed, set()
+            deleted, self._deleted = self._deleted, set()
+        
+        changed_files = sorted((p for p in changed if p.is_file()), key=lambda p: p.name)
+        deleted_files = [p for p in deleted if not p.exists()]
+        if not changed_files and not deleted_files:
+            return
+        
+        def task(run: IngestRun):
+            for path in deleted_files:
+                self.rag_service.delete_file(self.doc_processor.relative_name(path))
+            if changed_files:
+                self.ingest_jobs.pipeline.run(changed_files, run=run)
+        
+        job, started = self.ingest_jobs.start(kind="watch", task=task)
+        if not started:
+            # Another job holds the collection; retry after it finishes
+            with self._lock:
+                self._changed |= set(changed_files) - self._deleted
+                self._deleted |= set(deleted_files) - self._changed
+            return
+        
+        print(
+            f"Watcher started job {job.job_id}: "
+            f"{len(changed_files)} changed, {len(deleted_files)} deleted"
+        )
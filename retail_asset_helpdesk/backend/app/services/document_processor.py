@@ -1,14 +1,23 @@
 import os
+import bisect
 import hashlib
 import re
 from pathlib import Path
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Iterable, Iterator, Optional, Tuple
 from html.parser import HTMLParser
 
 from PyPDF2 import PdfReader
 
 from app.core.config import settings
+from app.services.code_index import extract_codes
+from app.services.content_cache import ExtractionCache
+from app.services.ingest_manifest import IngestManifest
 from app.utils.helpers import extract_category_from_filename, extract_doc_type_from_filename, clean_text
+from app.utils.tokens import CHARS_PER_TOKEN, get_encoding
+
+
+# A page of extracted text: (1-based page number or None, text)
+Page = Tuple[Optional[int], str]
 
 
 class HTMLTextExtractor(HTMLParser):
@@ -41,11 +50,24 @@ class HTMLTextExtractor(HTMLParser):
 class DocumentProcessor:
     """Process PDF and HTM documents and extract text with chunking."""
     
-    def __init__(self, docs_folder: Optional[str] = None):
+    def __init__(self, docs_folder: Optional[str] = None, manifest: Optional[IngestManifest] = None):
         self.docs_folder = Path(docs_folder or settings.DOCS_FOLDER)
+        self.manifest = manifest
         self.chunk_size = settings.CHUNK_SIZE
         self.chunk_overlap = settings.CHUNK_OVERLAP
+        self.chunk_size_unit = settings.CHUNK_SIZE_UNIT
         self.supported_extensions = ['.pdf', '.htm', '.html', '.txt']
+        self.extraction_cache = None
+        if settings.EXTRACTION_CACHE_MAX_MB > 0:
+            self.extraction_cache = ExtractionCache(
+                os.path.join(settings.CACHE_DIR, "extracted"),
+                max_bytes=settings.EXTRACTION_CACHE_MAX_MB * 1024 * 1024
+            )
+    
+    @property
+    def encoding(self):
+        """Tokenizer used when CHUNK_SIZE_UNIT is "tokens", loaded on first use."""
+        return get_encoding(settings.OPENAI_MODEL)
     
     def get_all_documents(self) -> List[Path]:
         """Get all supported document files in the docs folder."""
@@ -53,14 +75,53 @@ class DocumentProcessor:
             self.docs_folder.mkdir(parents=True, exist_ok=True)
             return []
         
-        documents = []
-        for ext in self.supported_extensions:
-            documents.extend(self.docs_folder.glob(f"*{ext}"))
-            documents.extend(self.docs_folder.glob(f"**/*{ext}"))  # Include subdirs
+        # Single recursive walk; "**" already includes the top level
+        documents = [
+            path for path in self.docs_folder.rglob("*")
+            if self.is_supported(path) and path.is_file()
+        ]
         
-        return sorted(set(documents), key=lambda p: p.name)
+        return sorted(documents, key=lambda p: p.name)
+    
+    def relative_name(self, filepath: Path) -> str:
+        """Get a document's path relative to the docs folder.
+        
+        This is the document's filename in the collection, since basenames
+        repeat across subfolders (oven/manual.pdf, fryer/manual.pdf).
+        """
+        try:
+            return Path(os.path.abspath(filepath)).relative_to(os.path.abspath(self.docs_folder)).as_posix()
+        except ValueError:
+            return filepath.name
+    
+    def is_supported(self, filepath: Path) -> bool:
+        """Check whether a path is a supported, non-hidden document."""
+        return (
+            filepath.suffix.lower() in self.supported_extensions
+            and not filepath.name.startswith('.')
+        )
     
     def get_file_hash(self, filepath: Path) -> str:
+        """Get MD5 hash of file for tracking, reusing the manifest when unchanged."""
+        if self.manifest is None:
+            return self.compute_file_hash(filepath)
+        
+        stat = filepath.stat()
+        file_hash = self.manifest.get_hash(filepath, stat)
+        if file_hash is None:
+            file_hash = self.compute_file_hash(filepath)
+            self.manifest.record(filepath, file_hash, stat)
+        return file_hash
+    
+    def save_manifest(self, documents: Optional[List[Path]] = None):
+        """Persist the hash manifest, forgetting files not in `documents`."""
+        if self.manifest is None:
+            return
+        if documents is not None:
+            self.manifest.prune(documents)
+        self.manifest.save()
+    
+    def compute_file_hash(self, filepath: Path) -> str:
         """Generate MD5 hash of file for tracking."""
         hasher = hashlib.md5()
         with open(filepath, 'rb') as f:
@@ -72,17 +133,20 @@ class DocumentProcessor:
     
     def extract_text_from_pdf(self, filepath: Path) -> str:
         """Extract text from a PDF file."""
+        return "\n".join(text for _, text in self.iter_pdf_pages(filepath))
+    
+    def iter_pdf_pages(self, filepath: Path, raise_errors: bool = False) -> Iterator[Page]:
+        """Yield the text of each PDF page, one page at a time."""
         try:
             reader = PdfReader(filepath)
-            text = ""
-            for page in reader.pages:
+            for number, page in enumerate(reader.pages, start=1):
                 page_text = page.extract_text()
                 if page_text:
-                    text += page_text + "\n"
-            return text
+                    yield number, page_text
         except Exception as e:
             print(f"Error extracting text from PDF {filepath}: {e}")
-            return ""
+            if raise_errors:
+                raise
     
     def extract_text_from_html(self, filepath: Path) -> str:
         """Extract text from an HTML/HTM file."""
@@ -105,7 +169,7 @@ class DocumentProcessor:
             parser = HTMLTextExtractor()
             parser.feed(content)
             return parser.get_text()
-            
+        
         except Exception as e:
             print(f"Error extracting text from HTML {filepath}: {e}")
             return ""
@@ -139,59 +203,159 @@ class DocumentProcessor:
             print(f"Unsupported file type: {extension}")
             return ""
     
+    def iter_pages(self, filepath: Path, content_hash: Optional[str] = None) -> Iterator[Page]:
+        """Yield the text of a document page by page (HTML and TXT are a single page).
+        
+        With a `content_hash`, pages come from the extraction cache when the
+        same bytes were extracted before, and are cached after a clean run.
+        """
+        cache = self.extraction_cache if content_hash else None
+        if cache is not None:
+            cached = cache.get(content_hash)
+            if cached is not None:
+                yield from cached
+                return
+        
+        pages: List[Page] = []
+        try:
+            for page in self._extract_pages(filepath):
+                if cache is not None:
+                    pages.append(page)
+                yield page
+        except Exception:
+            # Already logged; don't cache a partial extraction
+            return
+        
+        if cache is not None and pages:
+            cache.put(content_hash, pages)
+    
+    def _extract_pages(self, filepath: Path) -> Iterator[Page]:
+        if filepath.suffix.lower() == '.pdf':
+            yield from self.iter_pdf_pages(filepath, raise_errors=True)
+            return
+        
+        text = self.extract_text(filepath)
+        if text:
+            yield None, text
+    
     def chunk_text(self, text: str, metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
         """Split text into overlapping chunks with metadata."""
-        text = clean_text(text)
-        
-        if not text:
-            return []
+        return list(self.iter_chunks([(None, text)], metadata))
+    
+    def iter_chunks(self, pages: Iterable[Page], metadata: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Lazily split pages of text into overlapping chunks.
         
-        chunks = []
+        Only the text between the current chunk start and one chunk ahead is
+        buffered, so memory stays bounded however long the document is.
+        `start_char`/`end_char` are offsets into the cleaned text of the whole
+        document; `page_start`/`page_end` are the pages a chunk spans. Each
+        chunk starts at least half a chunk after the previous one, so a short
+        chunk can never make the next one repeat it.
+        """
+        pages = iter(pages)
+        exhausted = False
+        buffer = ""
+        base = 0  # Document offset of buffer[0]
+        page_offsets: List[int] = []
+        page_numbers: List[Optional[int]] = []
         start = 0
         chunk_id = 0
         
-        while start < len(text):
-            end = start + self.chunk_size
+        while True:
+            # Buffer enough text for a full chunk after `start`
+            while not exhausted and base + len(buffer) < start + self._window_chars():
+                page = next(pages, None)
+                if page is None:
+                    exhausted = True
+                    break
+                number, page_text = page
+                page_text = clean_text(page_text)
+                if not page_text:
+                    continue
+                if buffer:
+                    buffer += " "
+                page_offsets.append(base + len(buffer))
+                page_numbers.append(number)
+                buffer += page_text
             
-            # Try to break at sentence boundary
-            if end < len(text):
-                last_period = text.rfind('.', start + self.chunk_size - 100, end)
-                if last_period > start:
-                    end = last_period + 1
+            if start >= base + len(buffer):
+                break
             
-            chunk_text = text[start:end].strip()
+            end = base + self._chunk_end(buffer, start - base)
+            chunk_text = buffer[start - base:end - base].strip()
             
-            if chunk_text and len(chunk_text) > 50:  # Skip very small chunks
-                chunks.append({
+            if len(chunk_text) > 50:  # Skip very small chunks
+                chunk = {
                     "text": chunk_text,
                     "chunk_id": chunk_id,
                     "start_char": start,
                     "end_char": end,
+                    "codes": extract_codes(chunk_text),
                     **metadata
-                })
+                }
+                if page_numbers[0] is not None:
+                    chunk["page_start"] = page_numbers[bisect.bisect_right(page_offsets, start) - 1]
+                    chunk["page_end"] = page_numbers[bisect.bisect_right(page_offsets, end - 1) - 1]
+                yield chunk
                 chunk_id += 1
             
-            start = end - self.chunk_overlap
-            if start < 0:
-                start = 0
-            if start >= len(text):
+            if exhausted and end >= base + len(buffer):
                 break
+            
+            overlap = self._overlap_chars(buffer[start - base:end - base])
+            start = max(end - overlap, start + max(1, (end - start) // 2))
+            
+            # Drop text (and pages) that no later chunk can reach
+            buffer = buffer[start - base:]
+            base = start
+            first_page = max(bisect.bisect_right(page_offsets, start) - 1, 0)
+            del page_offsets[:first_page]
+            del page_numbers[:first_page]
+    
+    def _window_chars(self) -> int:
+        """Characters to buffer past a chunk start so a full chunk fits."""
+        if self.chunk_size_unit == "tokens":
+            # Generous upper bound on characters per token
+            return self.chunk_size * CHARS_PER_TOKEN * 2
+        return self.chunk_size
+    
+    def _chunk_end(self, buffer: str, start: int) -> int:
+        """End offset of the chunk starting at `start`, preferring a sentence boundary."""
+        if self.chunk_size_unit != "tokens":
+            end = start + self.chunk_size
+        elif self.encoding is None:
+            end = start + self.chunk_size * CHARS_PER_TOKEN
+        else:
+            window = buffer[start:start + self._window_chars()]
+            tokens = self.encoding.encode(window)
+            end = start + len(self.encoding.decode(tokens[:self.chunk_size]))
+        
+        if end >= len(buffer):
+            return len(buffer)
         
-        return chunks
+        # Try to break at sentence boundary
+        last_period = buffer.rfind('.', max(start, end - 100), end)
+        if last_period > start:
+            end = last_period + 1
+        return end
     
-    def process_document(self, filepath: Path) -> List[Dict[str, Any]]:
+    def _overlap_chars(self, chunk: str) -> int:
+        """Characters at the end of a chunk to repeat at the start of the next one."""
+        if self.chunk_size_unit != "tokens":
+            return self.chunk_overlap
+        if self.encoding is None:
+            return self.chunk_overlap * CHARS_PER_TOKEN
+        tokens = self.encoding.encode(chunk)
+        return len(self.encoding.decode(tokens[-self.chunk_overlap:])) if self.chunk_overlap else 0
+    
+    def process_document(self, filepath: Path, file_hash: Optional[str] = None) -> List[Dict[str, Any]]:
         """Process a single document file and return chunks with metadata."""
-        filename = filepath.name
-        file_hash = self.get_file_hash(filepath)
-        
-        # Extract text
-        text = self.extract_text(filepath)
-        if not text:
-            return []
+        filename = self.relative_name(filepath)
+        file_hash = file_hash or self.get_file_hash(filepath)
         
         # Build metadata
-        asset_category = extract_category_from_filename(filename)
-        doc_type = extract_doc_type_from_filename(filename)
+        asset_category = extract_category_from_filename(filepath.name)
+        doc_type = extract_doc_type_from_filename(filepath.name)
         
         metadata = {
             "filename": filename,
@@ -201,8 +365,11 @@ class DocumentProcessor:
             "doc_type": doc_type,
         }
         
-        # Chunk the text
-        chunks = self.chunk_text(text, metadata)
+        # File keys are "name:hash"; cached extractions are shared by content
+        content_hash = file_hash.rsplit(":", 1)[-1]
+        
+        # Chunk the text page by page as it is extracted
+        chunks = list(self.iter_chunks(self.iter_pages(filepath, content_hash), metadata))
         
         print(f"Processed {filename}: {len(chunks)} chunks")
         return chunks
\ No newline at end of file
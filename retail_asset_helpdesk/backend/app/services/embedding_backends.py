@@ -0,0 +1,141 @@
+from pathlib import Path
+from typing import List, Optional, Union
+
+import numpy as np
+
+from app.core.config import settings
+
+
+class SentenceTransformerBackend:
+    """Embeddings from a sentence-transformers (PyTorch) model."""
+    
+    name = "sentence-transformers"
+    
+    def __init__(self, model_name: str):
+        # Imported here so the ONNX backend never pulls in torch
+        from sentence_transformers import SentenceTransformer
+        
+        self.model = SentenceTransformer(model_name)
+        self.dimension = self.model.get_sentence_embedding_dimension()
+    
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        return self.model.encode(texts)
+
+
+class OnnxEmbeddingBackend:
+    """Embeddings from an exported ONNX model run with ONNX Runtime on CPU.
+    
+    Expects `model_dir` to hold `model.onnx` (and `model_int8.onnx` when
+    quantized) plus the `tokenizer.json` of the source model, as written by
+    `python -m scripts.embedding_onnx export`. Applies the same mean pooling
+    and L2 normalization as the sentence-transformers MiniLM pipeline.
+    """
+    
+    name = "onnx"
+    
+    def __init__(
+        self,
+        model_dir: str,
+        quantized: bool = True,
+        threads: int = 0,
+        max_length: int = 256,
+        normalize: bool = True,
+        batch_size: int = 32
+    ):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+        
+        model_dir = Path(model_dir)
+        model_path = model_dir / ("model_int8.onnx" if quantized else "model.onnx")
+        if not model_path.exists():
+            raise FileNotFoundError(
+                f"ONNX model not found at {model_path}; "
+                f"run `python -m scripts.embedding_onnx export` first"
+            )
+        
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads > 0:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(
+            str(model_path),
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        
+        self.tokenizer = Tokenizer.from_file(str(model_dir / "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        
+        self.normalize = normalize
+        self.batch_size = batch_size
+        self.dimension = self.session.get_outputs()[0].shape[-1]
+        if not isinstance(self.dimension, int):
+            self.dimension = self._encode_batch(["dimension probe"]).shape[1]
+    
+    def encode(self, texts: Union[str, List[str]]) -> np.ndarray:
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+        if not texts:
+            return np.zeros((0, self.dimension), dtype=np.float32)
+        
+        # Batch texts of similar length together to keep padding small
+        order = np.argsort([len(t) for t in texts])
+        embeddings = np.empty((len(texts), self.dimension), dtype=np.float32)
+        for i in range(0, len(texts), self.batch_size):
+            idx = order[i:i + self.batch_size]
+            embeddings[idx] = self._encode_batch([texts[j] for j in idx])
+        
+        return embeddings[0] if single else embeddings
+    
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            inputs["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, inputs)[0]
+        
+        # Mean pooling over real (non-padding) tokens
+        mask = attention_mask[..., None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.normalize:
+            pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
+
+
+def embedding_model_id() -> str:
+    """Identify the configured model precisely enough to key stored vectors by it."""
+    if settings.EMBEDDING_BACKEND == "onnx":
+        variant = "int8" if settings.ONNX_QUANTIZED else "fp32"
+        return f"onnx:{settings.ONNX_MODEL_DIR}:{variant}:{settings.ONNX_MAX_LENGTH}"
+    return f"{settings.EMBEDDING_BACKEND}:{settings.EMBEDDING_MODEL}"
+
+
+def create_embedding_backend(backend: Optional[str] = None):
+    """Build the embedding backend selected by `EMBEDDING_BACKEND`."""
+    backend = backend or settings.EMBEDDING_BACKEND
+    if backend == "onnx":
+        model = OnnxEmbeddingBackend(
+            settings.ONNX_MODEL_DIR,
+            quantized=settings.ONNX_QUANTIZED,
+            threads=settings.ONNX_THREADS,
+            max_length=settings.ONNX_MAX_LENGTH,
+            normalize=settings.ONNX_NORMALIZE
+        )
+    elif backend == "sentence-transformers":
+        model = SentenceTransformerBackend(settings.EMBEDDING_MODEL)
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}")
+    
+    if model.dimension != settings.EMBEDDING_DIMENSION:
+        raise ValueError(
+            f"{backend} model produces {model.dimension}-dim vectors, "
+            f"but EMBEDDING_DIMENSION is {settings.EMBEDDING_DIMENSION}"
+        )
+    return model
@@ -0,0 +1,90 @@
+import asyncio
+from concurrent.futures import Executor
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class EmbeddingBatcher:
+    """Collect concurrent query embeddings into a single encode call.
+    
+    Callers await `embed(text)`. Texts arriving within `max_wait_ms` of the
+    first pending text (or until `max_batch_size` is reached) are encoded
+    together on the executor, and each caller gets back its own vector.
+    """
+    
+    def __init__(
+        self,
+        encode_batch: Callable[[List[str]], List[List[float]]],
+        executor: Optional[Executor] = None,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        self._encode_batch = encode_batch
+        self._executor = executor
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+        
+        # Counters for observability
+        self.batches = 0
+        self.texts = 0
+    
+    async def embed(self, text: str) -> List[float]:
+        """Queue a text for the next batch and wait for its vector."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.max_wait, self._flush)
+        
+        return await future
+    
+    def _flush(self):
+        """Hand the pending texts to the executor as one batch."""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        
+        task = asyncio.get_running_loop().create_task(self._run_batch(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _run_batch(self, batch: List[Tuple[str, asyncio.Future]]):
+        """Encode a batch and resolve each caller's future."""
+        # Identical concurrent queries share a single row in the batch
+        unique_texts = list(dict.fromkeys(text for text, _ in batch))
+        
+        loop = asyncio.get_running_loop()
+        try:
+            vectors = await loop.run_in_executor(
+                self._executor, self._encode_batch, unique_texts
+            )
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        
+        self.batches += 1
+        self.texts += len(batch)
+        
+        by_text = dict(zip(unique_texts, vectors))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get batching statistics."""
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+        }
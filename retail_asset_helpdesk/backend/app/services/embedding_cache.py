@@ -0,0 +1,79 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_query(text: str) -> str:
+    """Normalize a query so trivially different phrasings share a cache key."""
+    text = re.sub(r'\s+', ' ', text.strip().lower())
+    return text.rstrip('?!. ')
+
+
+class EmbeddingCache:
+    """Bounded LRU cache of query vectors with TTL expiry.
+    
+    Vectors are stored as float32 numpy arrays, keyed by the normalized
+    query string. Safe to share between the sync and async request paths.
+    """
+    
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 86400.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, tuple[float, np.ndarray]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, text: str) -> Optional[List[float]]:
+        """Return the cached vector for a query, or None."""
+        if self.max_size <= 0:
+            return None
+        
+        key = normalize_query(text)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            stored_at, vector = entry
+            if self.ttl_seconds and time.monotonic() - stored_at > self.ttl_seconds:
+                del self._entries[key]
+                self.misses += 1
+                return None
+            
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return vector.tolist()
+    
+    def put(self, text: str, vector: List[float]):
+        """Store a query vector, evicting the least recently used entry."""
+        if self.max_size <= 0:
+            return
+        
+        key = normalize_query(text)
+        with self._lock:
+            self._entries[key] = (time.monotonic(), np.asarray(vector, dtype=np.float32))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+    
+    def clear(self):
+        """Drop all cached vectors."""
+        with self._lock:
+            self._entries.clear()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get cache statistics."""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+        }
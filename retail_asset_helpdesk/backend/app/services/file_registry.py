@@ -0,0 +1,181 @@
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, Set
+
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+from qdrant_client.http.models import Distance, VectorParams, PointStruct
+
+from app.services import collection_aliases
+
+
+# Namespace for registry point IDs (one point per ingested file key)
+REGISTRY_ID_NAMESPACE = uuid.UUID("8f0b7a36-2f7e-4c1e-9a52-61d6a3c4e0b9")
+
+
+class FileRegistry:
+    """Compact record of ingested files kept in a small side collection.
+    
+    Holds one point per `name:hash` file key with its filename and chunk
+    count, so startup can load every ingested file in a single call instead
+    of scrolling all chunk payloads of the main collection.
+    """
+    
+    def __init__(self, qdrant: QdrantClient, collection_name: str):
+        self.qdrant = qdrant
+        self.collection_name = collection_name
+    
+    def ensure(self):
+        """Create the registry collection if it doesn't exist."""
+        if self.exists():
+            return
+        # Registry points carry no meaningful vector; a 1-dim placeholder keeps them tiny
+        self.qdrant.create_collection(
+            collection_name=self.collection_name,
+            vectors_config=VectorParams(size=1, distance=Distance.DOT)
+        )
+        print(f"Created file registry: {self.collection_name}")
+    
+    def exists(self) -> bool:
+        return collection_aliases.name_exists(self.qdrant, self.collection_name)
+    
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Read all registry entries, keyed by file key."""
+        count = self.qdrant.count(self.collection_name, exact=True).count
+        if count == 0:
+            return {}
+        
+        points, _ = self.qdrant.scroll(
+            collection_name=self.collection_name,
+            limit=count,
+            with_payload=True,
+            with_vectors=False
+        )
+        return {
+            point.payload["file_key"]: point.payload
+            for point in points
+            if point.payload and "file_key" in point.payload
+        }
+    
+    def upsert(self, file_key: str, filename: str, chunk_count: int):
+        """Record a fully ingested file."""
+        self.upsert_many({file_key: {"filename": filename, "chunk_count": chunk_count}})
+    
+    def upsert_many(self, entries: Dict[str, Dict[str, Any]]):
+        """Record several files at once ({file_key: {"filename", "chunk_count"}})."""
+        if not entries:
+            return
+        now = time.time()
+        points = [
+            PointStruct(
+                id=self._point_id(file_key),
+                vector=[1.0],
+                payload={
+                    "file_key": file_key,
+                    "filename": entry["filename"],
+                    "chunk_count": entry["chunk_count"],
+                    "ingested_at": entry.get("ingested_at", now),
+                }
+            )
+            for file_key, entry in entries.items()
+        ]
+        self.qdrant.upsert(collection_name=self.collection_name, points=points)
+    
+    def delete(self, file_keys: Iterable[str]):
+        """Forget files whose chunks were removed."""
+        ids = [self._point_id(file_key) for file_key in file_keys]
+        if not ids:
+            return
+        self.qdrant.delete(
+            collection_name=self.collection_name,
+            points_selector=models.PointIdsList(points=ids)
+        )
+    
+    def drop(self):
+        """Delete the registry collection (and its alias, if it is served through one)."""
+        collection_aliases.drop(self.qdrant, self.collection_name)
+    
+    @staticmethod
+    def _point_id(file_key: str) -> str:
+        return str(uuid.uuid5(REGISTRY_ID_NAMESPACE, file_key))
+
+
+class IngestedFiles:
+    """In-memory mirror of the file registry with incrementally kept counters.
+    
+    Answers "is this file ingested?" and corpus statistics without touching
+    Qdrant; totals are updated as files are added and removed.
+    """
+    
+    def __init__(self):
+        self._files: Dict[str, Dict[str, Any]] = {}
+        self._chunks_by_filename: Dict[str, int] = {}
+        self._versions_by_filename: Dict[str, int] = {}
+        self._total_chunks = 0
+        self._lock = threading.Lock()
+    
+    def __contains__(self, file_key: str) -> bool:
+        return file_key in self._files
+    
+    def __len__(self) -> int:
+        return len(self._files)
+    
+    def keys(self) -> Set[str]:
+        """Get the set of ingested file keys."""
+        with self._lock:
+            return set(self._files)
+    
+    def chunk_counts(self) -> Dict[str, int]:
+        """Get the chunk count of every ingested file key."""
+        with self._lock:
+            return {k: entry["chunk_count"] for k, entry in self._files.items()}
+    
+    def keys_for(self, filename: str) -> Set[str]:
+        """Get the file keys (versions) recorded for a filename."""
+        with self._lock:
+            return {k for k, entry in self._files.items() if entry["filename"] == filename}
+    
+    def add(self, file_key: str, filename: str, chunk_count: int):
+        """Record a file, replacing any previous entry for the same key."""
+        with self._lock:
+            self._discard(file_key)
+            self._files[file_key] = {"filename": filename, "chunk_count": chunk_count}
+            self._chunks_by_filename[filename] = self._chunks_by_filename.get(filename, 0) + chunk_count
+            self._versions_by_filename[filename] = self._versions_by_filename.get(filename, 0) + 1
+            self._total_chunks += chunk_count
+    
+    def remove(self, file_keys: Iterable[str]):
+        """Forget files whose chunks were deleted."""
+        with self._lock:
+            for file_key in file_keys:
+                self._discard(file_key)
+    
+    def clear(self):
+        with self._lock:
+            self._files.clear()
+            self._chunks_by_filename.clear()
+            self._versions_by_filename.clear()
+            self._total_chunks = 0
+    
+    def stats(self) -> Dict[str, Any]:
+        """Get total files and total chunks."""
+        with self._lock:
+            return {
+                "total_files": len(self._chunks_by_filename),
+                "total_chunks": self._total_chunks,
+            }
+    
+    def _discard(self, file_key: str):
+        """Remove a file key and update the counters (caller holds the lock)."""
+        entry = self._files.pop(file_key, None)
+        if entry is None:
+            return
+        filename = entry["filename"]
+        self._total_chunks -= entry["chunk_count"]
+        self._versions_by_filename[filename] -= 1
+        if self._versions_by_filename[filename] == 0:
+            del self._versions_by_filename[filename]
+            del self._chunks_by_filename[filename]
+        else:
+            self._chunks_by_filename[filename] -= entry["chunk_count"]
@@ -0,0 +1,128 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from app.services.document_processor import DocumentProcessor
+from app.services.ingest_pipeline import IngestPipeline, IngestRun
+
+
+class IngestJob:
+    """A background ingestion job and its progress."""
+    
+    def __init__(self, kind: str):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.status = "pending"
+        self.created_at = datetime.now(timezone.utc)
+        self.started_at: Optional[datetime] = None
+        self.finished_at: Optional[datetime] = None
+        self.error: Optional[str] = None
+        self.run = IngestRun()
+        self._done = threading.Event()
+    
+    def is_active(self) -> bool:
+        return self.status in ("pending", "running")
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finishes; returns False on timeout."""
+        return self._done.wait(timeout)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "error": self.error,
+            **self.run.progress(),
+            **self.run.to_dict(),
+        }
+
+
+class IngestJobManager:
+    """Run ingestion jobs on a background thread, one at a time.
+    
+    Every write to the collection (manual ingest, watcher, reindex, delete)
+    goes through `start`, so at most one job touches the collection at once.
+    """
+    
+    def __init__(
+        self,
+        pipeline: IngestPipeline,
+        doc_processor: DocumentProcessor,
+        max_history: int = 20
+    ):
+        self.pipeline = pipeline
+        self.doc_processor = doc_processor
+        self.max_history = max_history
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._active: Optional[IngestJob] = None
+        self._lock = threading.Lock()
+    
+    def start(
+        self,
+        kind: str = "ingest",
+        task: Optional[Callable[[IngestRun], Any]] = None
+    ) -> Tuple[IngestJob, bool]:
+        """Start a job unless one is already active.
+        
+        Returns (job, started). When a job is already active it is returned
+        with started=False. The default task ingests every new document.
+        """
+        with self._lock:
+            if self._active is not None and self._active.is_active():
+                return self._active, False
+            
+            job = IngestJob(kind)
+            self._active = job
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > self.max_history:
+                self._jobs.popitem(last=False)
+        
+        task = task or self._ingest_all
+        thread = threading.Thread(
+            target=self._run_job,
+            args=(job, task),
+            name=f"ingest-job-{job.job_id[:8]}",
+            daemon=True
+        )
+        thread.start()
+        return job, True
+    
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        """Get a job by ID."""
+        return self._jobs.get(job_id)
+    
+    def list_jobs(self) -> List[IngestJob]:
+        """Get recent jobs, newest first."""
+        return list(reversed(self._jobs.values()))
+    
+    def active_job(self) -> Optional[IngestJob]:
+        """Get the job currently running, if any."""
+        job = self._active
+        return job if job is not None and job.is_active() else None
+    
+    def _ingest_all(self, run: IngestRun):
+        documents = self.doc_processor.get_all_documents()
+        self.pipeline.run(documents, run=run)
+    
+    def _run_job(self, job: IngestJob, task: Callable[[IngestRun], Any]):
+        job.status = "running"
+        job.started_at = datetime.now(timezone.utc)
+        job.run.started_at = time.monotonic()
+        try:
+            task(job.run)
+            job.status = "completed"
+        except Exception as e:
+            print(f"Ingest job {job.job_id} failed: {e}")
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            job.run.finish()
+            job.finished_at = datetime.now(timezone.utc)
+            job._done.set()
@@ -0,0 +1,79 @@
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional
+
+
+class IngestManifest:
+    """Persistent record of file size, mtime and hash for the docs folder.
+    
+    Lets callers skip re-hashing a file whose size and mtime are unchanged,
+    so scanning the docs folder costs one `stat` per file instead of reading
+    every byte. Stored as a JSON sidecar and written atomically.
+    """
+    
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._load()
+    
+    def _load(self):
+        """Load the manifest from disk, starting empty if it is missing or corrupt."""
+        if not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self._entries = json.load(f).get("files", {})
+        except Exception as e:
+            print(f"Error loading ingest manifest {self.path}: {e}")
+            self._entries = {}
+    
+    def get_hash(self, filepath: Path, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        """Return the recorded hash if the file's size and mtime are unchanged."""
+        stat = stat or filepath.stat()
+        with self._lock:
+            entry = self._entries.get(str(filepath))
+        if entry and entry["size"] == stat.st_size and entry["mtime_ns"] == stat.st_mtime_ns:
+            return entry["hash"]
+        return None
+    
+    def record(self, filepath: Path, file_hash: str, stat: Optional[os.stat_result] = None):
+        """Record the hash of a file along with its current size and mtime."""
+        stat = stat or filepath.stat()
+        with self._lock:
+            self._entries[str(filepath)] = {
+                "size": stat.st_size,
+                "mtime_ns": stat.st_mtime_ns,
+                "hash": file_hash,
+            }
+            self._dirty = True
+    
+    def prune(self, existing: Iterable[Path]):
+        """Forget files that are no longer present."""
+        keep = {str(p) for p in existing}
+        with self._lock:
+            removed = [p for p in self._entries if p not in keep]
+            for p in removed:
+                del self._entries[p]
+            if removed:
+                self._dirty = True
+    
+    def save(self):
+        """Write the manifest to disk if it changed."""
+        with self._lock:
+            if not self._dirty:
+                return
+            data = {"files": dict(self._entries)}
+            self._dirty = False
+        
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"Error saving ingest manifest {self.path}: {e}")
@@ -0,0 +1,354 @@
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessor
+from app.services.qdrant_service import QdrantRAGService
+
+
+# Sentinel telling the embedding stage that extraction has finished
+_DONE = object()
+
+# Forking the multi-threaded server process can deadlock workers on inherited
+# locks, so worker processes (extraction, snapshot upload) start clean instead
+POOL_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def _process_file(filepath: str, file_key: str, docs_folder: str) -> List[Dict[str, Any]]:
+    """Worker process entry point: extract and chunk a single document."""
+    processor = DocumentProcessor(docs_folder)
+    return processor.process_document(Path(filepath), file_hash=file_key)
+
+
+class IngestRun:
+    """Book-keeping and progress for a single pipeline run, shared by all stages."""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.new_files: List[str] = []
+        self.skipped_files: List[str] = []
+        self.errors: List[str] = []
+        self.files_total = 0
+        self.files_done = 0
+        self.chunks_embedded = 0
+        self.chunks_ingested = 0
+        self.started_at = time.monotonic()
+        self.finished_at: Optional[float] = None
+        self._remaining: Dict[str, int] = {}
+        self._chunk_counts: Dict[str, int] = {}
+        self._failed: Set[str] = set()
+    
+    def expect(self, file_key: str, chunk_count: int):
+        """Register a file whose chunks are entering the embedding stage."""
+        with self._lock:
+            self._remaining[file_key] = chunk_count
+            self._chunk_counts[file_key] = chunk_count
+    
+    def skip(self, reason: str, error: bool = False, done: bool = False):
+        """Record a file that will not be ingested.
+        
+        `done=True` marks a queued file with nothing to ingest and `error=True`
+        one that was given up on; both count as done.
+        """
+        with self._lock:
+            self.skipped_files.append(reason)
+            if error:
+                self.errors.append(reason)
+            if error or done:
+                self.files_done += 1
+    
+    def fail(self, file_key: str, filename: str, error: Exception):
+        """Mark a file as failed; its remaining chunks are still drained."""
+        with self._lock:
+            if file_key in self._failed:
+                return
+            self._failed.add(file_key)
+            reason = f"{filename} (error: {error})"
+            self.skipped_files.append(reason)
+            self.errors.append(reason)
+            self.files_done += 1
+    
+    def add_embedded(self, count: int):
+        """Record chunks that have been embedded."""
+        with self._lock:
+            self.chunks_embedded += count
+    
+    def chunks_finished(
+        self,
+        chunks: List[Dict[str, Any]],
+        stored: bool = True
+    ) -> List[Tuple[str, str, int]]:
+        """Record processed chunks and return (file_key, filename, chunk_count) of completed files.
+        
+        Completed files count as ingested once `file_ingested` is called for them.
+        """
+        completed = []
+        with self._lock:
+            if stored:
+                self.chunks_ingested += len(chunks)
+            for chunk in chunks:
+                file_key = chunk['file_hash']
+                self._remaining[file_key] -= 1
+                if self._remaining[file_key] == 0 and file_key not in self._failed:
+                    completed.append((file_key, chunk['filename'], self._chunk_counts[file_key]))
+        return completed
+    
+    def file_ingested(self, filename: str):
+        """Record a completed file that is now in the registry."""
+        with self._lock:
+            self.new_files.append(filename)
+            self.files_done += 1
+    
+    def finish(self):
+        """Stop the clock used for throughput and elapsed time."""
+        with self._lock:
+            self.finished_at = time.monotonic()
+    
+    def progress(self) -> Dict[str, Any]:
+        """Get progress counters, throughput and a rough ETA."""
+        with self._lock:
+            elapsed = (self.finished_at or time.monotonic()) - self.started_at
+            files_left = self.files_total - self.files_done
+            eta = None
+            if self.files_done and files_left > 0:
+                eta = round(elapsed / self.files_done * files_left, 1)
+            elif files_left == 0:
+                eta = 0.0
+            return {
+                "files_total": self.files_total,
+                "files_done": self.files_done,
+                "chunks_embedded": self.chunks_embedded,
+                "chunks_ingested": self.chunks_ingested,
+                "chunks_per_second": round(self.chunks_embedded / elapsed, 2) if elapsed else 0.0,
+                "elapsed_seconds": round(elapsed, 1),
+                "eta_seconds": eta,
+                "errors": list(self.errors),
+            }
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "new_files": list(self.new_files),
+            "skipped_files": list(self.skipped_files),
+            "chunks_ingested": self.chunks_ingested,
+        }
+
+
+class IngestPipeline:
+    """Pipelined document ingestion: extract -> embed -> upsert.
+    
+    Extraction and chunking run in a process pool with a per-file timeout,
+    embedding runs in large batches that span documents, and upserts run
+    concurrently on a thread pool. Bounded queues between the stages cap
+    how much extracted text and embedded points are held in memory.
+    """
+    
+    def __init__(
+        self,
+        doc_processor: DocumentProcessor,
+        rag_service: QdrantRAGService,
+        workers: Optional[int] = None,
+        file_timeout: Optional[float] = None,
+        embed_batch_size: Optional[int] = None,
+        upsert_batch_size: Optional[int] = None,
+        upsert_workers: Optional[int] = None,
+        queue_size: Optional[int] = None
+    ):
+        self.doc_processor = doc_processor
+        self.rag_service = rag_service
+        self.workers = workers or settings.INGEST_WORKERS or os.cpu_count() or 1
+        self.file_timeout = file_timeout or settings.INGEST_FILE_TIMEOUT_SECONDS
+        self.embed_batch_size = embed_batch_size or settings.INGEST_EMBED_BATCH_SIZE
+        self.upsert_batch_size = upsert_batch_size or settings.INGEST_UPSERT_BATCH_SIZE
+        self.upsert_workers = upsert_workers or settings.INGEST_UPSERT_WORKERS
+        self.queue_size = queue_size or settings.INGEST_QUEUE_SIZE
+    
+    def run(self, documents: List[Path], run: Optional[IngestRun] = None) -> Dict[str, Any]:
+        """Ingest the documents that are not already in the collection.
+        
+        Pass an `IngestRun` to observe progress from another thread.
+        """
+        run = run or IngestRun()
+        
+        pending = []
+        queued: Set[str] = set()
+        for doc_path in documents:
+            # Use path+hash to allow same content under different names
+            file_hash = self.doc_processor.get_file_hash(doc_path)
+            file_key = f"{self.doc_processor.relative_name(doc_path)}:{file_hash}"
+            
+            if self.rag_service.is_file_ingested(file_key) or file_key in queued:
+                run.skip(self.doc_processor.relative_name(doc_path))
+                continue
+            queued.add(file_key)
+            pending.append((doc_path, file_key))
+        
+        self.doc_processor.save_manifest()
+        run.files_total = len(pending)
+        
+        if not pending:
+            return run.to_dict()
+        
+        chunk_queue: queue.Queue = queue.Queue(maxsize=self.queue_size)
+        embedder = threading.Thread(
+            target=self._embed_stage,
+            args=(chunk_queue, run),
+            name="ingest-embed",
+            daemon=True
+        )
+        embedder.start()
+        
+        try:
+            self._extract_stage(pending, chunk_queue, run)
+        finally:
+            chunk_queue.put(_DONE)
+            embedder.join()
+        
+        print(f"Ingest run complete: {len(run.new_files)} files, {run.chunks_ingested} chunks")
+        return run.to_dict()
+    
+    def _new_pool(self):
+        return multiprocessing.get_context(POOL_START_METHOD).Pool(processes=self.workers)
+    
+    def _extract_stage(
+        self,
+        pending: List[Tuple[Path, str]],
+        chunk_queue: queue.Queue,
+        run: IngestRun
+    ):
+        """Extract and chunk files in worker processes, feeding the chunk queue."""
+        todo = list(pending)
+        in_flight: Dict[str, Tuple[Any, Path, float]] = {}
+        docs_folder = str(self.doc_processor.docs_folder)
+        pool = self._new_pool()
+        
+        try:
+            while todo or in_flight:
+                # Keep exactly one file per worker in flight so submission time ~ start time
+                while todo and len(in_flight) < self.workers:
+                    doc_path, file_key = todo.pop(0)
+                    async_result = pool.apply_async(
+                        _process_file, (str(doc_path), file_key, docs_folder)
+                    )
+                    in_flight[file_key] = (async_result, doc_path, time.monotonic())
+                
+                oldest = next(iter(in_flight.values()))[0]
+                oldest.wait(0.05)
+                
+                timed_out = False
+                for file_key, (async_result, doc_path, started) in list(in_flight.items()):
+                    name = self.doc_processor.relative_name(doc_path)
+                    if async_result.ready():
+                        del in_flight[file_key]
+                        try:
+                            chunks = async_result.get()
+                        except Exception as e:
+                            run.skip(f"{name} (extraction failed: {e})", error=True)
+                            continue
+                        
+                        if not chunks:
+                            # Scanned or image-only documents are expected, not failures
+                            run.skip(f"{name} (no text extracted)", done=True)
+                            continue
+                        
+                        run.expect(file_key, len(chunks))
+                        chunk_queue.put(chunks)
+                    elif time.monotonic() - started > self.file_timeout:
+                        del in_flight[file_key]
+                        run.skip(f"{name} (timed out after {self.file_timeout:.0f}s)", error=True)
+                        timed_out = True
+                
+                if timed_out:
+                    # A hung worker cannot be reclaimed individually, so replace
+                    # the pool and resubmit whatever else was in flight
+                    pool.terminate()
+                    pool.join()
+                    todo = [(doc_path, key) for key, (_, doc_path, _) in in_flight.items()] + todo
+                    in_flight.clear()
+                    pool = self._new_pool()
+        finally:
+            pool.terminate()
+            pool.join()
+    
+    def _embed_stage(self, chunk_queue: queue.Queue, run: IngestRun):
+        """Embed chunks in cross-document batches and dispatch upserts."""
+        upserter = ThreadPoolExecutor(
+            max_workers=self.upsert_workers,
+            thread_name_prefix="ingest-upsert"
+        )
+        # Caps the number of embedded batches waiting to be upserted
+        upsert_slots = threading.BoundedSemaphore(self.upsert_workers * 2)
+        buffer: List[Dict[str, Any]] = []
+        
+        try:
+            while True:
+                item = chunk_queue.get()
+                if item is _DONE:
+                    break
+                
+                buffer.extend(item)
+                while len(buffer) >= self.embed_batch_size:
+                    batch = buffer[:self.embed_batch_size]
+                    buffer = buffer[self.embed_batch_size:]
+                    self._embed_and_dispatch(batch, run, upserter, upsert_slots)
+            
+            if buffer:
+                self._embed_and_dispatch(buffer, run, upserter, upsert_slots)
+        finally:
+            upserter.shutdown(wait=True)
+    
+    def _embed_and_dispatch(
+        self,
+        batch: List[Dict[str, Any]],
+        run: IngestRun,
+        upserter: ThreadPoolExecutor,
+        upsert_slots: threading.BoundedSemaphore
+    ):
+        try:
+            embeddings = self.rag_service.embed_batch([chunk['text'] for chunk in batch])
+            points = self.rag_service.build_points(batch, embeddings)
+        except Exception as e:
+            print(f"Embedding error: {e}")
+            for chunk in batch:
+                run.fail(chunk['file_hash'], chunk['filename'], e)
+            run.chunks_finished(batch, stored=False)
+            return
+        
+        run.add_embedded(len(batch))
+        
+        for i in range(0, len(points), self.upsert_batch_size):
+            upsert_slots.acquire()
+            future = upserter.submit(
+                self._upsert,
+                points[i:i + self.upsert_batch_size],
+                batch[i:i + self.upsert_batch_size],
+                run
+            )
+            future.add_done_callback(lambda _: upsert_slots.release())
+    
+    def _upsert(self, points, chunks: List[Dict[str, Any]], run: IngestRun):
+        stored = True
+        try:
+            self.rag_service.upsert_points(points)
+        except Exception as e:
+            print(f"Upsert error: {e}")
+            stored = False
+            for chunk in chunks:
+                run.fail(chunk['file_hash'], chunk['filename'], e)
+        
+        for file_key, filename, chunk_count in run.chunks_finished(chunks, stored):
+            try:
+                self.rag_service.mark_file_ingested(file_key, filename, chunk_count)
+            except Exception as e:
+                # Not registered, so the next run picks the file up again
+                print(f"Registry error for {filename}: {e}")
+                run.fail(file_key, filename, e)
+                continue
+            run.file_ingested(filename)
@@ -0,0 +1,345 @@
+import json
+import os
+import shutil
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+import numpy as np
+from qdrant_client.http import models
+from qdrant_client.http.models import PointStruct
+
+
+class LocalVectorIndex:
+    """Exact cosine-similarity index over a memory-mapped vector matrix.
+    
+    Vectors are L2-normalized and stored one per row in `vectors.bin`
+    (float32, or int8 with a per-row scale in `scales.bin`). Payloads are
+    held in memory and persisted to an append-only `payloads.jsonl` log,
+    compacted when it grows stale. Search is a NumPy matmul over the
+    candidate rows and a partial sort, so it is exact and needs no server.
+    """
+    
+    INDEXED_FIELDS = ("filename", "asset_category", "file_hash", "doc_type", "codes")
+    
+    # Rows scored per matmul, bounding the float32 copy made for int8 vectors
+    _BLOCK_ROWS = 8192
+    
+    def __init__(self, directory: str, dimension: int, dtype: str = "float32"):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported local index dtype: {dtype}")
+        self.directory = Path(directory)
+        self.dimension = dimension
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.RLock()
+        self._reset_state()
+        self._load()
+    
+    def __len__(self) -> int:
+        return len(self._rows)
+    
+    def _reset_state(self):
+        self._ids: List[Optional[str]] = []
+        self._payloads: List[Optional[Dict[str, Any]]] = []
+        self._rows: Dict[str, int] = {}
+        self._free: List[int] = []
+        self._postings: Dict[str, Dict[str, Set[int]]] = {f: {} for f in self.INDEXED_FIELDS}
+        self._capacity = 0
+        self._vectors: Optional[np.memmap] = None
+        self._scales: Optional[np.memmap] = None
+        self._alive = np.zeros(0, dtype=bool)
+        self._log_entries = 0
+    
+    @property
+    def _meta_path(self) -> Path:
+        return self.directory / "meta.json"
+    
+    @property
+    def _log_path(self) -> Path:
+        return self.directory / "payloads.jsonl"
+    
+    def _load(self):
+        """Open the matrix and replay the payload log, starting empty if unusable."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if not self._meta_path.exists():
+            self._write_meta()
+            return
+        
+        try:
+            with open(self._meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            if meta["dimension"] != self.dimension or meta["dtype"] != self.dtype.name:
+                print(f"Local index at {self.directory} has a different layout; starting empty")
+                self.clear()
+                return
+            
+            self._open(meta["capacity"])
+            if self._log_path.exists():
+                with open(self._log_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        if line.strip():
+                            self._replay(json.loads(line))
+            
+            used = set(self._rows.values())
+            self._free = [r for r in range(len(self._ids)) if r not in used]
+            print(f"Loaded local vector index: {len(self._rows)} points")
+        except Exception as e:
+            print(f"Error loading local vector index {self.directory}: {e}")
+            self.clear()
+    
+    def _replay(self, entry: Dict[str, Any]):
+        point_id = entry["id"]
+        row = self._rows.pop(point_id, None)
+        if row is not None:
+            self._unindex(row)
+        self._log_entries += 1
+        if entry.get("deleted"):
+            return
+        
+        row = entry["row"]
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._payloads.append(None)
+        self._set_row(row, point_id, entry["payload"])
+    
+    def _write_meta(self):
+        with open(self._meta_path, 'w', encoding='utf-8') as f:
+            json.dump({
+                "dimension": self.dimension,
+                "dtype": self.dtype.name,
+                "capacity": self._capacity,
+            }, f)
+    
+    def _open(self, capacity: int):
+        """(Re)map the vector files with room for `capacity` rows."""
+        if self._vectors is not None:
+            self._vectors.flush()
+        self._vectors = self._map("vectors.bin", self.dtype, (capacity, self.dimension))
+        if self.dtype == np.int8:
+            self._scales = self._map("scales.bin", np.dtype("float32"), (capacity,))
+        
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(self._alive)] = self._alive[:capacity]
+        self._alive = alive
+        self._capacity = capacity
+    
+    def _map(self, name: str, dtype: np.dtype, shape) -> Optional[np.memmap]:
+        path = self.directory / name
+        size = int(np.prod(shape)) * dtype.itemsize
+        with open(path, 'ab') as f:
+            f.truncate(size)
+        if size == 0:
+            return None
+        return np.memmap(path, dtype=dtype, mode='r+', shape=shape)
+    
+    def _allocate(self) -> int:
+        if self._free:
+            return self._free.pop()
+        row = len(self._ids)
+        self._ids.append(None)
+        self._payloads.append(None)
+        if row >= self._capacity:
+            self._open(max(1024, self._capacity * 2))
+            self._write_meta()
+        return row
+    
+    def _set_row(self, row: int, point_id: str, payload: Dict[str, Any]):
+        self._ids[row] = point_id
+        self._payloads[row] = payload
+        self._rows[point_id] = row
+        self._alive[row] = True
+        for field in self.INDEXED_FIELDS:
+            for value in self._field_values(payload, field):
+                self._postings[field].setdefault(value, set()).add(row)
+    
+    def _unindex(self, row: int):
+        payload = self._payloads[row] or {}
+        for field in self.INDEXED_FIELDS:
+            for value in self._field_values(payload, field):
+                rows = self._postings[field].get(value)
+                if rows is not None:
+                    rows.discard(row)
+                    if not rows:
+                        del self._postings[field][value]
+        self._ids[row] = None
+        self._payloads[row] = None
+        self._alive[row] = False
+    
+    @staticmethod
+    def _field_values(payload: Dict[str, Any], field: str) -> List[str]:
+        value = payload.get(field)
+        if value is None:
+            return []
+        return [str(v) for v in value] if isinstance(value, list) else [str(value)]
+    
+    def upsert(self, points: List[PointStruct]):
+        """Insert or replace points."""
+        if not points:
+            return
+        vectors = np.asarray([point.vector for point in points], dtype=np.float32)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        
+        with self._lock:
+            rows = []
+            for point in points:
+                point_id = str(point.id)
+                row = self._rows.pop(point_id, None)
+                if row is not None:
+                    self._unindex(row)
+                else:
+                    row = self._allocate()
+                self._set_row(row, point_id, dict(point.payload or {}))
+                rows.append(row)
+            
+            if self.dtype == np.int8:
+                scales = np.clip(np.abs(vectors).max(axis=1), 1e-12, None) / 127.0
+                self._vectors[rows] = np.round(vectors / scales[:, None]).astype(np.int8)
+                self._scales[rows] = scales
+                self._scales.flush()
+            else:
+                self._vectors[rows] = vectors
+            self._vectors.flush()
+            
+            self._append_log(
+                {"id": self._ids[row], "row": row, "payload": self._payloads[row]}
+                for row in rows
+            )
+    
+    def delete(self, point_ids: Iterable[str]):
+        """Remove points by ID."""
+        with self._lock:
+            removed = []
+            for point_id in point_ids:
+                row = self._rows.pop(str(point_id), None)
+                if row is None:
+                    continue
+                self._unindex(row)
+                self._free.append(row)
+                removed.append(str(point_id))
+            self._append_log({"id": point_id, "deleted": True} for point_id in removed)
+    
+    def ids_where(
+        self,
+        must: Dict[str, Any],
+        must_not: Optional[Dict[str, Any]] = None
+    ) -> List[str]:
+        """IDs of points whose payload matches every `must` and no `must_not` value."""
+        with self._lock:
+            rows = self._candidate_rows(must)
+            rows = set(rows.tolist()) if rows is not None else set(self._rows.values())
+            excluded = self._candidate_rows(must_not or {})
+            if excluded is not None:
+                rows -= set(excluded.tolist())
+            return [self._ids[row] for row in rows]
+    
+    def search(
+        self,
+        vector: List[float],
+        limit: int = 5,
+        filters: Optional[Dict[str, Any]] = None
+    ) -> List[models.ScoredPoint]:
+        """Exact top-k by cosine similarity among points matching `filters`."""
+        query = np.asarray(vector, dtype=np.float32)
+        query /= max(float(np.linalg.norm(query)), 1e-12)
+        
+        with self._lock:
+            rows = self._candidate_rows(filters or {})
+            if rows is None:
+                rows = np.flatnonzero(self._alive[:len(self._ids)])
+            if not len(rows) or limit <= 0:
+                return []
+            
+            scores = self._scores(rows, query)
+            k = min(limit, len(rows))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return [
+                models.ScoredPoint(
+                    id=self._ids[rows[i]],
+                    version=0,
+                    score=float(scores[i]),
+                    payload=dict(self._payloads[rows[i]])
+                )
+                for i in top
+            ]
+    
+    def find(self, filters: Dict[str, Any], limit: int) -> List[models.Record]:
+        """Points matching `filters` (list values match any), without scoring."""
+        with self._lock:
+            rows = self._candidate_rows(filters)
+            if rows is None:
+                rows = np.flatnonzero(self._alive[:len(self._ids)])
+            return [
+                models.Record(id=self._ids[row], payload=dict(self._payloads[row]))
+                for row in rows[:limit]
+            ]
+    
+    def _candidate_rows(self, filters: Dict[str, Any]) -> Optional[np.ndarray]:
+        """Rows matching all filters via the payload postings; None means no filter."""
+        result: Optional[Set[int]] = None
+        for field, value in filters.items():
+            if value is None:
+                continue
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            postings = self._postings.get(field, {})
+            matched: Set[int] = set()
+            for v in values:
+                matched |= postings.get(str(v), set())
+            result = matched if result is None else result & matched
+        if result is None:
+            return None
+        return np.array(sorted(result), dtype=np.int64)
+    
+    def _scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(len(rows), dtype=np.float32)
+        for start in range(0, len(rows), self._BLOCK_ROWS):
+            block_rows = rows[start:start + self._BLOCK_ROWS]
+            if block_rows[-1] - block_rows[0] + 1 == len(block_rows):
+                # Contiguous rows: slice the memmap instead of gathering
+                block = self._vectors[block_rows[0]:block_rows[-1] + 1]
+            else:
+                block = self._vectors[block_rows]
+            block_scores = block.astype(np.float32, copy=False) @ query
+            if self.dtype == np.int8:
+                block_scores *= self._scales[block_rows]
+            scores[start:start + len(block_rows)] = block_scores
+        return scores
+    
+    def file_entries(self) -> Dict[str, Dict[str, Any]]:
+        """Ingested files ({file_key: {"filename", "chunk_count"}}) derived from payloads."""
+        with self._lock:
+            entries: Dict[str, Dict[str, Any]] = {}
+            for file_key, rows in self._postings["file_hash"].items():
+                payload = self._payloads[next(iter(rows))]
+                entries[file_key] = {"filename": payload.get("filename", ""), "chunk_count": len(rows)}
+            return entries
+    
+    def _append_log(self, entries: Iterable[Dict[str, Any]]):
+        lines = [json.dumps(entry) for entry in entries]
+        if not lines:
+            return
+        with open(self._log_path, 'a', encoding='utf-8') as f:
+            f.write("\n".join(lines) + "\n")
+        self._log_entries += len(lines)
+        
+        if self._log_entries > 2 * len(self._rows) + 1000:
+            self._compact_log()
+    
+    def _compact_log(self):
+        """Rewrite the payload log with only the live points."""
+        tmp_path = self._log_path.with_suffix(".jsonl.tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for point_id, row in self._rows.items():
+                f.write(json.dumps({"id": point_id, "row": row, "payload": self._payloads[row]}) + "\n")
+        os.replace(tmp_path, self._log_path)
+        self._log_entries = len(self._rows)
+    
+    def clear(self):
+        """Remove every point and the files backing them."""
+        with self._lock:
+            self._vectors = None
+            self._scales = None
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self._reset_state()
+            self._write_meta()
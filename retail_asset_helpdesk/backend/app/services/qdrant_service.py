@@ -1,118 +1,689 @@
+import asyncio
+import os
+import threading
+import time
 import uuid
-from typing import List, Dict, Any, Optional, Set
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Set, Tuple, AsyncIterator
 
-from qdrant_client import QdrantClient
+import numpy as np
+from qdrant_client import QdrantClient, AsyncQdrantClient
 from qdrant_client.http import models
 from qdrant_client.http.models import Distance, VectorParams, PointStruct
-from sentence_transformers import SentenceTransformer
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
 
 from app.core.config import settings
+from app.services.embedding_backends import create_embedding_backend, embedding_model_id
+from app.services.embedding_batcher import EmbeddingBatcher
+from app.services.content_cache import EmbeddingStore
+from app.services.embedding_cache import EmbeddingCache
+from app.services.answer_cache import AnswerCache, Scope
+from app.services import collection_aliases
+from app.services.code_index import CodeLookupCache, extract_codes
+from app.services.context_packer import ContextPacker
+from app.services.file_registry import FileRegistry, IngestedFiles
+from app.services.local_vector_index import LocalVectorIndex
+from app.services.resilience import CircuitBreaker, aretry_call, retry_call
+from app.utils.tokens import CHARS_PER_TOKEN
+
+
+# Namespace for deterministic chunk point IDs
+CHUNK_ID_NAMESPACE = uuid.UUID("55bbdf12-96aa-4214-bba2-cbf494210b6b")
+
+
+def make_point_id(chunk: Dict[str, Any]) -> str:
+    """Derive a stable point ID for a chunk.
+    
+    In replace mode the ID depends only on the document's path and chunk
+    index, so a changed file overwrites its previous chunks in place.
+    Otherwise the file hash is included and each version of a file gets its
+    own points.
+    """
+    if settings.INGEST_REPLACE_CHANGED:
+        key = f"{chunk['filename']}#{chunk['chunk_id']}"
+    else:
+        key = f"{chunk['file_hash']}#{chunk['chunk_id']}"
+    return str(uuid.uuid5(CHUNK_ID_NAMESPACE, key))
 
 
 class QdrantRAGService:
     """RAG service using Qdrant vector database."""
     
-    def __init__(self):
+    # Payload fields with keyword indexes, so filtered searches only visit matching points
+    PAYLOAD_INDEX_FIELDS = ("filename", "asset_category", "file_hash", "doc_type", "codes")
+    
+    NO_CONTEXT_ANSWER = "I don't have any relevant documentation to answer your question. Please make sure the relevant equipment manuals have been ingested."
+    
+    RAG_SYSTEM_PROMPT = """You are a helpful retail equipment support assistant. Your role is to help users troubleshoot equipment issues, find maintenance procedures, understand error codes, and provide guidance based on equipment documentation.
+
+Guidelines:
+- For greetings (hi, hello, hey, etc.) or casual conversation, respond briefly and friendly without diving into technical details. Simply greet back and ask how you can help.
+- Only provide technical guidance when the user asks a specific question about equipment.
+- Provide clear, step-by-step instructions when applicable
+- If the documentation mentions safety warnings, always include them
+- If you're not sure about something, say so rather than guessing
+- Reference specific error codes or procedures when mentioned in the documentation
+- Be concise and to the point, brief the answers to max of 5 pointed steps. Each step should be of 1 short sentence.
+- Even if the documentation doesn't contain relevant information to answer the question, there is no need to let the user know that documentation. You can suggest from overall understanding of retail equipment.
+
+Examples:
+- User: "Hi" → Response: "Hello! How can I help you with your equipment today?"
+- User: "Hey there" → Response: "Hi! What can I assist you with?"
+- User: "Coffee machine not working" → Provide troubleshooting steps"""
+    
+    def __init__(self, connect: bool = True):
+        """Set up caches and executors; connect to Qdrant unless `connect=False`.
+        
+        The embedding model is loaded lazily on first use (or by `warmup`).
+        """
+        self.COLLECTION_NAME = settings.QDRANT_COLLECTION
+        
+        # Query vectors shared by search and query_with_llm
+        self._embedding_cache = EmbeddingCache(
+            max_size=settings.EMBEDDING_CACHE_SIZE,
+            ttl_seconds=settings.EMBEDDING_CACHE_TTL_SECONDS
+        )
+        
+        # Chunk vectors on disk, so re-chunking or re-indexing unchanged text skips the model
+        self._embedding_store: Optional[EmbeddingStore] = None
+        if settings.EMBEDDING_STORE_MAX_MB > 0:
+            try:
+                self._embedding_store = EmbeddingStore(
+                    os.path.join(settings.CACHE_DIR, "embeddings"),
+                    model_id=embedding_model_id(),
+                    dimension=settings.EMBEDDING_DIMENSION,
+                    max_bytes=settings.EMBEDDING_STORE_MAX_MB * 1024 * 1024
+                )
+            except Exception as e:
+                print(f"Embedding store unavailable: {e}")
+        
+        # LLM answers for near-duplicate questions, cleared when the corpus changes
+        self._answer_cache = AnswerCache(
+            max_size=settings.ANSWER_CACHE_SIZE,
+            ttl_seconds=settings.ANSWER_CACHE_TTL_SECONDS,
+            similarity_threshold=settings.ANSWER_CACHE_SIMILARITY_THRESHOLD
+        )
+        
+        # Exact error-code / part-number lookups, cleared with the answer cache
+        self._code_cache = CodeLookupCache(max_size=settings.CODE_LOOKUP_CACHE_SIZE)
+        
+        # Merges overlapping chunks and caps the context sent to the LLM;
+        # its max_overlap is in characters, CHUNK_OVERLAP may be in tokens
+        overlap_chars = settings.CHUNK_OVERLAP
+        if settings.CHUNK_SIZE_UNIT == "tokens":
+            overlap_chars *= CHARS_PER_TOKEN
+        self._context_packer = ContextPacker(
+            token_budget=settings.CONTEXT_TOKEN_BUDGET,
+            dedup_threshold=settings.CONTEXT_DEDUP_THRESHOLD,
+            max_overlap=overlap_chars,
+            model=settings.OPENAI_MODEL
+        )
+        
+        # CPU-bound embedding work runs here instead of on the event loop
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.EMBEDDING_WORKERS,
+            thread_name_prefix="embedding"
+        )
+        
+        # Concurrent query embeddings are coalesced into one encode call
+        self._embedding_batcher = EmbeddingBatcher(
+            self._encode,
+            executor=self._executor,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS
+        )
+        
+        # Ingested files and corpus counters, mirrored from the file registry
+        self._files = IngestedFiles()
+        
+        self._search_params = self._build_search_params()
+        
+        self._embedding_model = None
+        self._model_lock = threading.Lock()
+        self.qdrant = None
+        self.async_qdrant = None
+        self.openai_client = None
+        self.async_openai_client = None
+        self._registry = None
+        self._collection_version: Optional[str] = None
+        self._local_index: Optional[LocalVectorIndex] = None
+        self._available = False
+        self._connect_error: Optional[str] = None
+        self._warmup_report: Optional[Dict[str, Any]] = None
+        
+        # Fail fast (to the local index or extractive answers) while a dependency keeps failing
+        self._qdrant_breaker = CircuitBreaker(
+            "Qdrant",
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_SECONDS
+        )
+        self._openai_breaker = CircuitBreaker(
+            "OpenAI",
+            failure_threshold=settings.BREAKER_FAILURE_THRESHOLD,
+            reset_timeout=settings.BREAKER_RESET_SECONDS
+        )
+        self._reconnect_lock = threading.Lock()
+        self._reconnecting = False
+        self._last_connect_attempt = 0.0
+        
+        if connect:
+            self.connect()
+    
+    def connect(self) -> bool:
+        """Connect to Qdrant and OpenAI, ensure the collection and load the file registry."""
+        self._last_connect_attempt = time.monotonic()
+        
+        # In-process index: the only store in local mode, otherwise a mirror
+        # that keeps search working while Qdrant is unreachable
+        if self._local_index is None and (settings.VECTOR_BACKEND == "local" or settings.LOCAL_INDEX_FALLBACK):
+            self._local_index = LocalVectorIndex(
+                settings.LOCAL_INDEX_DIR,
+                settings.EMBEDDING_DIMENSION,
+                dtype=settings.LOCAL_INDEX_DTYPE
+            )
+        if settings.VECTOR_BACKEND == "local":
+            return self._connect_local()
+        
         try:
-            self.qdrant = QdrantClient(
+            qdrant = QdrantClient(
                 host=settings.QDRANT_HOST,
                 port=settings.QDRANT_PORT,
-                timeout=5.0  # 5 second timeout
+                timeout=settings.QDRANT_TIMEOUT_SECONDS
             )
-            self.COLLECTION_NAME = settings.QDRANT_COLLECTION
+            self.qdrant = qdrant
+            self._registry = FileRegistry(qdrant, f"{self.COLLECTION_NAME}_files")
+            self._init_openai_clients()
             
-            # Initialize embedding model
-            print(f"Loading embedding model: {settings.EMBEDDING_MODEL}")
-            self.embedding_model = SentenceTransformer(settings.EMBEDDING_MODEL)
-            
-            # Initialize OpenAI client
-            self.openai_client = OpenAI(api_key=settings.OPENAI_API_KEY)
-            
-            # Track ingested files
-            self._ingested_hashes: Set[str] = set()
+            # Async Qdrant client for the request path, so a slow Qdrant call
+            # does not block the event loop
+            if settings.RAG_ASYNC_MODE:
+                self.async_qdrant = AsyncQdrantClient(
+                    host=settings.QDRANT_HOST,
+                    port=settings.QDRANT_PORT,
+                    timeout=settings.QDRANT_TIMEOUT_SECONDS
+                )
             
             # Ensure collection exists
             self._ensure_collection()
+            self._files.clear()
             self._load_ingested_hashes()
+            if self._local_index is not None:
+                self._sync_local_index()
             
             self._available = True
+            self._connect_error = None
+            self._qdrant_breaker.record_success()
             print("✅ Qdrant service initialized successfully")
         except Exception as e:
             print(f"⚠️  Qdrant service not available: {e}")
             print("   RAG features will be disabled, but asset management will work")
             self._available = False
+            self._connect_error = str(e)
             self.qdrant = None
-            self.embedding_model = None
+            self.async_qdrant = None
+            self._registry = None
             self.openai_client = None
-            self._ingested_hashes = set()
-    
-    def is_available(self) -> bool:
-        """Check if Qdrant service is available."""
+            self.async_openai_client = None
+            if self._local_index is not None and len(self._local_index):
+                # Answer questions from the local mirror until Qdrant is back
+                self._init_openai_clients()
+                print(f"   Serving searches from the local index ({len(self._local_index)} chunks)")
         return self._available
     
-    def _ensure_collection(self):
-        """Create collection if it doesn't exist."""
-        collections = self.qdrant.get_collections().collections
-        collection_names = [c.name for c in collections]
-        
-        if self.COLLECTION_NAME not in collection_names:
-            self.qdrant.create_collection(
-                collection_name=self.COLLECTION_NAME,
-                vectors_config=VectorParams(
-                    size=settings.EMBEDDING_DIMENSION,
-                    distance=Distance.COSINE
-                )
+    def _init_openai_clients(self):
+        # Bounded timeout and few SDK retries: the breaker handles sustained outages
+        self.openai_client = OpenAI(
+            api_key=settings.OPENAI_API_KEY,
+            timeout=settings.OPENAI_TIMEOUT_SECONDS,
+            max_retries=settings.OPENAI_MAX_RETRIES
+        )
+        if settings.RAG_ASYNC_MODE:
+            self.async_openai_client = AsyncOpenAI(
+                api_key=settings.OPENAI_API_KEY,
+                timeout=settings.OPENAI_TIMEOUT_SECONDS,
+                max_retries=settings.OPENAI_MAX_RETRIES
             )
-            print(f"Created collection: {self.COLLECTION_NAME}")
     
-    def _load_ingested_hashes(self):
-        """Load existing file hashes from collection."""
+    def _maybe_reconnect(self):
+        """Retry connecting to Qdrant in the background, at most once per RECONNECT_INTERVAL_SECONDS.
+        
+        Called from the request path, so a Qdrant that was unreachable at
+        startup (or when the last attempt ran) is picked up without a restart
+        and without making the request wait for the connection attempt.
+        """
+        if self._available or settings.VECTOR_BACKEND == "local":
+            return
+        with self._reconnect_lock:
+            if self._reconnecting:
+                return
+            if time.monotonic() - self._last_connect_attempt < settings.RECONNECT_INTERVAL_SECONDS:
+                return
+            self._reconnecting = True
+        threading.Thread(target=self._reconnect, name="qdrant-reconnect", daemon=True).start()
+    
+    def _reconnect(self):
         try:
-            # Scroll through all points to get unique file hashes
+            self.connect()
+        finally:
+            self._reconnecting = False
+    
+    def _qdrant_read(self, func, *args, **kwargs):
+        """Run an idempotent Qdrant read with jittered retries behind the circuit breaker."""
+        return retry_call(
+            self._qdrant_breaker,
+            func,
+            *args,
+            attempts=settings.QDRANT_READ_RETRIES + 1,
+            base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+            **kwargs
+        )
+    
+    async def _aqdrant_read(self, func, *args, **kwargs):
+        """Async variant of _qdrant_read."""
+        return await aretry_call(
+            self._qdrant_breaker,
+            func,
+            *args,
+            attempts=settings.QDRANT_READ_RETRIES + 1,
+            base_delay=settings.RETRY_BASE_DELAY_SECONDS,
+            max_delay=settings.RETRY_MAX_DELAY_SECONDS,
+            **kwargs
+        )
+    
+    def _connect_local(self) -> bool:
+        """Use the local vector index as the only store (no Qdrant)."""
+        self._init_openai_clients()
+        self._files.clear()
+        for file_key, entry in self._local_index.file_entries().items():
+            self._files.add(file_key, entry["filename"], entry["chunk_count"])
+        
+        self._available = True
+        self._connect_error = None
+        print(f"✅ Local vector index ready ({len(self._local_index)} chunks)")
+        return True
+    
+    def _sync_local_index(self):
+        """Rebuild the local mirror from Qdrant unless it holds the same files.
+        
+        File keys include the content hash, so comparing them with the
+        registry catches files replaced in place (same point count) by
+        another process or while this one was down.
+        """
+        try:
+            points_count = self.qdrant.count(self.COLLECTION_NAME, exact=True).count
+            mirrored = {k: entry["chunk_count"] for k, entry in self._local_index.file_entries().items()}
+            if points_count == len(self._local_index) and mirrored == self._files.chunk_counts():
+                return
+            
+            print(f"Rebuilding local index from Qdrant ({points_count} points)")
+            self._local_index.clear()
             offset = None
             while True:
-                results = self.qdrant.scroll(
+                points, offset = self.qdrant.scroll(
                     collection_name=self.COLLECTION_NAME,
-                    limit=100,
+                    limit=1000,
                     offset=offset,
                     with_payload=True,
-                    with_vectors=False
+                    with_vectors=True
                 )
-                
-                points, offset = results
-                
-                for point in points:
-                    if point.payload and 'file_hash' in point.payload:
-                        self._ingested_hashes.add(point.payload['file_hash'])
-                
+                self._local_index.upsert([
+                    PointStruct(id=point.id, vector=point.vector, payload=point.payload)
+                    for point in points
+                ])
                 if offset is None:
                     break
+        except Exception as e:
+            print(f"Error syncing local index: {e}")
+    
+    def _serve_locally(self) -> bool:
+        """Whether searches go to the local index: it is the store, or Qdrant is down."""
+        return self._local_index is not None and (
+            settings.VECTOR_BACKEND == "local" or self.qdrant is None
+        )
+    
+    def _async_search_ready(self) -> bool:
+        return self.async_qdrant is not None or self._serve_locally()
+    
+    @property
+    def embedding_model(self):
+        """The embedding backend (sentence-transformers or ONNX), loaded on first use."""
+        if self._embedding_model is None:
+            with self._model_lock:
+                if self._embedding_model is None:
+                    print(f"Loading embedding model: {settings.EMBEDDING_MODEL} ({settings.EMBEDDING_BACKEND})")
+                    self._embedding_model = create_embedding_backend()
+        return self._embedding_model
+    
+    def is_available(self) -> bool:
+        """Check if Qdrant service is available."""
+        return self._available
+    
+    def warmup(self) -> Dict[str, Any]:
+        """Load the embedding model and run one search so the first request is fast."""
+        report: Dict[str, Any] = {}
+        started = time.perf_counter()
+        
+        if not self._available:
+            self.connect()
+        
+        step = time.perf_counter()
+        vector = self.embedding_model.encode("warmup").tolist()
+        report["embedding_ms"] = round((time.perf_counter() - step) * 1000, 1)
+        
+        if self._available or self._serve_locally():
+            step = time.perf_counter()
+            self._search_vector(vector, limit=1)
+            report["search_ms"] = round((time.perf_counter() - step) * 1000, 1)
+        
+        report["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if self._available:
+            self._warmup_report = report
+            print(f"Warmup complete in {report['total_ms']}ms")
+        return report
+    
+    def record_warmup_failure(self, error: Exception):
+        """Give up on warming up, reporting the error instead of staying unready."""
+        self._warmup_report = {"error": str(error)}
+    
+    def get_readiness(self) -> Dict[str, Any]:
+        """Report per-dependency readiness and warmup latency."""
+        self._maybe_reconnect()
+        dependencies = {
+            "qdrant": {
+                "ready": self._available,
+                "error": self._connect_error,
+                "circuit": self._qdrant_breaker.state,
+            },
+            "embedding_model": {
+                "ready": self._embedding_model is not None,
+                "model": settings.EMBEDDING_MODEL,
+                "backend": settings.EMBEDDING_BACKEND,
+            },
+            "openai": {
+                "ready": self.openai_client is not None and bool(settings.OPENAI_API_KEY),
+                "circuit": self._openai_breaker.state,
+            },
+        }
+        if self._local_index is not None:
+            dependencies["local_index"] = {
+                "ready": True,
+                "mode": "primary" if settings.VECTOR_BACKEND == "local" else "fallback",
+                "points": len(self._local_index),
+            }
+        warmed_up = self._warmup_report is not None or not settings.WARMUP_ENABLED
+        return {
+            "ready": self._available and warmed_up,
+            "dependencies": dependencies,
+            "warmup": self._warmup_report,
+        }
+    
+    def _ensure_collection(self):
+        """Create collection if it doesn't exist.
+        
+        New collections are versioned and served through a COLLECTION_NAME
+        alias (and a registry alias), so a reindex can swap them atomically.
+        """
+        if not collection_aliases.name_exists(self.qdrant, self.COLLECTION_NAME):
+            collection_name = collection_aliases.versioned_name(self.qdrant, self.COLLECTION_NAME)
+            self.create_collection(collection_name)
+            FileRegistry(self.qdrant, f"{collection_name}_files").ensure()
+            collection_aliases.point_aliases(self.qdrant, {
+                self.COLLECTION_NAME: collection_name,
+                self._registry.collection_name: f"{collection_name}_files",
+            })
+            print(f"Created collection: {collection_name} (alias {self.COLLECTION_NAME})")
+        else:
+            self._migrate_collection_config()
+            self._ensure_payload_indexes()
+        
+        self._collection_version = collection_aliases.resolve(self.qdrant, self.COLLECTION_NAME)
+    
+    def create_collection(self, collection_name: str):
+        """Create a collection with the current vector, HNSW and quantization settings."""
+        self.qdrant.create_collection(
+            collection_name=collection_name,
+            vectors_config=VectorParams(
+                size=settings.EMBEDDING_DIMENSION,
+                distance=Distance.COSINE,
+                on_disk=settings.QDRANT_VECTORS_ON_DISK
+            ),
+            hnsw_config=self._hnsw_config(),
+            quantization_config=self._quantization_config(),
+            on_disk_payload=settings.QDRANT_PAYLOAD_ON_DISK
+        )
+        self._ensure_payload_indexes(collection_name)
+    
+    def activate_collection(self, collection_name: str) -> Optional[str]:
+        """Serve a fully built collection by switching the aliases to it.
+        
+        Returns the collection the alias pointed at before, if any.
+        """
+        previous = collection_aliases.point_aliases(self.qdrant, {
+            self.COLLECTION_NAME: collection_name,
+            self._registry.collection_name: f"{collection_name}_files",
+        })
+        self._collection_version = collection_name
+        self._files.clear()
+        self._load_ingested_hashes()
+        self._invalidate_corpus_caches()
+        if self._local_index is not None:
+            self._local_index.clear()
+            self._sync_local_index()
+        return previous[self.COLLECTION_NAME]
+    
+    def _hnsw_config(self) -> models.HnswConfigDiff:
+        return models.HnswConfigDiff(
+            m=settings.QDRANT_HNSW_M,
+            ef_construct=settings.QDRANT_HNSW_EF_CONSTRUCT
+        )
+    
+    def _quantization_config(self) -> Optional[models.ScalarQuantization]:
+        if settings.QDRANT_QUANTIZATION == "none":
+            return None
+        if settings.QDRANT_QUANTIZATION != "int8":
+            raise ValueError(f"Unsupported QDRANT_QUANTIZATION: {settings.QDRANT_QUANTIZATION}")
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=settings.QDRANT_QUANTIZATION_QUANTILE,
+                always_ram=settings.QDRANT_QUANTIZATION_ALWAYS_RAM
+            )
+        )
+    
+    def _build_search_params(self) -> Optional[models.SearchParams]:
+        """Search-time HNSW ef and quantization rescoring, or None for Qdrant defaults."""
+        quantization = None
+        if settings.QDRANT_QUANTIZATION != "none":
+            quantization = models.QuantizationSearchParams(
+                rescore=settings.QDRANT_RESCORE,
+                oversampling=settings.QDRANT_OVERSAMPLING
+            )
+        hnsw_ef = settings.QDRANT_HNSW_EF or None
+        if quantization is None and hnsw_ef is None:
+            return None
+        return models.SearchParams(hnsw_ef=hnsw_ef, quantization=quantization)
+    
+    def _migrate_collection_config(self):
+        """Bring an existing collection in line with the tuning settings.
+        
+        Qdrant rebuilds indexes and moves storage in the background, so the
+        collection stays searchable while a migration is applied.
+        """
+        config = self.qdrant.get_collection(self.COLLECTION_NAME).config
+        changes: Dict[str, Any] = {}
+        
+        vectors = config.params.vectors
+        if isinstance(vectors, VectorParams) and bool(vectors.on_disk) != settings.QDRANT_VECTORS_ON_DISK:
+            changes["vectors_config"] = {
+                "": models.VectorParamsDiff(on_disk=settings.QDRANT_VECTORS_ON_DISK)
+            }
+        
+        hnsw = config.hnsw_config
+        if (hnsw.m, hnsw.ef_construct) != (settings.QDRANT_HNSW_M, settings.QDRANT_HNSW_EF_CONSTRUCT):
+            changes["hnsw_config"] = self._hnsw_config()
+        
+        quantization = self._quantization_config()
+        if quantization != config.quantization_config:
+            changes["quantization_config"] = quantization or models.Disabled.DISABLED
+        
+        if bool(config.params.on_disk_payload) != settings.QDRANT_PAYLOAD_ON_DISK:
+            changes["collection_params"] = models.CollectionParamsDiff(
+                on_disk_payload=settings.QDRANT_PAYLOAD_ON_DISK
+            )
+        
+        if not changes:
+            return
+        self.qdrant.update_collection(collection_name=self.COLLECTION_NAME, **changes)
+        print(f"Updated collection config for {self.COLLECTION_NAME}: {', '.join(changes)}")
+    
+    @property
+    def collection_version(self) -> Optional[str]:
+        """The versioned collection currently behind the COLLECTION_NAME alias."""
+        return self._collection_version
+    
+    def _ensure_payload_indexes(self, collection_name: Optional[str] = None):
+        """Create keyword payload indexes used by filtered search and deletes."""
+        collection_name = collection_name or self.COLLECTION_NAME
+        payload_schema = self.qdrant.get_collection(collection_name).payload_schema or {}
+        
+        for field_name in self.PAYLOAD_INDEX_FIELDS:
+            if field_name in payload_schema:
+                continue
+            self.qdrant.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=models.PayloadSchemaType.KEYWORD,
+                wait=True
+            )
+            print(f"Created payload index: {field_name}")
+    
+    def _load_ingested_hashes(self):
+        """Load ingested file keys from the file registry."""
+        try:
+            self._registry.ensure()
+            entries = self._registry.load()
             
-            print(f"Loaded {len(self._ingested_hashes)} ingested file hashes")
+            if not entries and self.qdrant.get_collection(self.COLLECTION_NAME).points_count:
+                entries = self._backfill_registry()
+            
+            for file_key, entry in entries.items():
+                self._files.add(file_key, entry["filename"], entry["chunk_count"])
+            print(f"Loaded {len(self._files)} ingested file hashes")
         except Exception as e:
             print(f"Error loading ingested hashes: {e}")
     
+    def load_file_registry(self) -> Dict[str, Dict[str, Any]]:
+        """Read the file registry entries of the live collection."""
+        return self._registry.load() if self._registry is not None else {}
+    
+    def _backfill_registry(self) -> Dict[str, Dict[str, Any]]:
+        """Build the registry from chunk payloads (one-off, for collections that predate it)."""
+        print("File registry empty; rebuilding it from the collection")
+        entries: Dict[str, Dict[str, Any]] = {}
+        offset = None
+        while True:
+            points, offset = self.qdrant.scroll(
+                collection_name=self.COLLECTION_NAME,
+                limit=1000,
+                offset=offset,
+                with_payload=["file_hash", "filename"],
+                with_vectors=False
+            )
+            
+            for point in points:
+                if point.payload and 'file_hash' in point.payload:
+                    entry = entries.setdefault(point.payload['file_hash'], {
+                        "filename": point.payload.get('filename', ''),
+                        "chunk_count": 0,
+                    })
+                    entry["chunk_count"] += 1
+            
+            if offset is None:
+                break
+        
+        self._registry.upsert_many(entries)
+        return entries
+    
     def is_file_ingested(self, file_hash: str) -> bool:
         """Check if a file has already been ingested."""
         if not self._available:
             return False
-        return file_hash in self._ingested_hashes
+        return file_hash in self._files
     
     def get_ingested_files(self) -> Set[str]:
         """Get set of ingested file hashes."""
-        return self._ingested_hashes.copy()
+        return self._files.keys()
     
     def _embed_text(self, text: str) -> List[float]:
         """Generate embedding for text."""
-        if not self._available:
+        self._maybe_reconnect()
+        if not self._available and not self._serve_locally():
             return []
-        return self.embedding_model.encode(text).tolist()
+        
+        cached = self._embedding_cache.get(text)
+        if cached is not None:
+            return cached
+        
+        embedding = self.embedding_model.encode(text).tolist()
+        self._embedding_cache.put(text, embedding)
+        return embedding
+    
+    async def _aembed_text(self, text: str) -> List[float]:
+        """Generate embedding for text, batched with concurrent queries."""
+        self._maybe_reconnect()
+        if not self._available and not self._serve_locally():
+            return []
+        
+        cached = self._embedding_cache.get(text)
+        if cached is not None:
+            return cached
+        
+        embedding = await self._embedding_batcher.embed(text)
+        self._embedding_cache.put(text, embedding)
+        return embedding
+    
+    async def _run_in_executor(self, func, *args):
+        """Run a blocking call on the service executor."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
     
-    def _embed_batch(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts."""
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        """Embed query texts with the model; only ingested chunks go to the embedding store."""
         return self.embedding_model.encode(texts).tolist()
     
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """Embed query texts, encoding all cache misses in a single call."""
+        embeddings = [self._embedding_cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+        if not missing:
+            return embeddings
+        
+        computed = dict(zip(missing, self._encode(missing)))
+        for text, embedding in computed.items():
+            self._embedding_cache.put(text, embedding)
+        return [
+            embedding if embedding is not None else computed[text]
+            for text, embedding in zip(texts, embeddings)
+        ]
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for chunk texts, reusing vectors stored on disk."""
+        if self._embedding_store is None:
+            return self.embedding_model.encode(texts).tolist()
+        
+        vectors = self._embedding_store.get_many(texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            missing_texts = [texts[i] for i in missing]
+            encoded = np.asarray(self.embedding_model.encode(missing_texts), dtype=np.float32)
+            self._embedding_store.put_many(missing_texts, encoded)
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return [vector.tolist() for vector in vectors]
+    
     def ingest_chunks(self, chunks: List[Dict[str, Any]]) -> int:
         """Ingest document chunks into Qdrant."""
         if not self._available:
@@ -122,41 +693,146 @@ class QdrantRAGService:
         
         # Extract texts and generate embeddings
         texts = [chunk['text'] for chunk in chunks]
-        embeddings = self._embed_batch(texts)
+        embeddings = self.embed_batch(texts)
+        
+        points = self.build_points(chunks, embeddings)
+        
+        # Upsert in batches
+        batch_size = settings.INGEST_UPSERT_BATCH_SIZE
+        for i in range(0, len(points), batch_size):
+            self.upsert_points(points[i:i + batch_size])
+        
+        # Track file hash
+        self.mark_file_ingested(chunks[0]['file_hash'], chunks[0]['filename'], len(points))
         
-        # Create points
+        print(f"Ingested {len(points)} chunks")
+        return len(points)
+    
+    def build_points(
+        self,
+        chunks: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> List[PointStruct]:
+        """Create Qdrant points from chunks and their embeddings."""
         points = []
-        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings)):
-            point_id = str(uuid.uuid4())
+        for chunk, embedding in zip(chunks, embeddings):
+            point_id = make_point_id(chunk)
             payload = {
                 "text": chunk['text'],
                 "filename": chunk['filename'],
                 "file_hash": chunk['file_hash'],
                 "chunk_id": chunk['chunk_id'],
+                "start_char": chunk.get('start_char'),
+                "end_char": chunk.get('end_char'),
+                "page_start": chunk.get('page_start'),
+                "page_end": chunk.get('page_end'),
                 "asset_category": chunk.get('asset_category', 'general'),
                 "doc_type": chunk.get('doc_type', 'manual'),
+                "codes": chunk.get('codes', []),
             }
             points.append(PointStruct(
                 id=point_id,
                 vector=embedding,
                 payload=payload
             ))
+        return points
+    
+    def upsert_points(self, points: List[PointStruct]):
+        """Upsert a batch of points into the collection."""
+        if not self._available:
+            raise Exception("Qdrant service not available")
+        if self.qdrant is not None:
+            self._qdrant_breaker.call(
+                self.qdrant.upsert,
+                collection_name=self.COLLECTION_NAME,
+                points=points
+            )
+        if self._local_index is not None:
+            self._local_index.upsert(points)
+    
+    def mark_file_ingested(self, file_hash: str, filename: str, chunk_count: int):
+        """Record a fully ingested file and invalidate corpus-dependent caches.
         
-        # Upsert in batches
-        batch_size = 100
-        for i in range(0, len(points), batch_size):
-            batch = points[i:i + batch_size]
-            self.qdrant.upsert(
+        In replace mode, chunks left over from earlier versions of the same
+        filename are deleted once the new version is fully stored.
+        """
+        if settings.INGEST_REPLACE_CHANGED:
+            self.delete_stale_chunks(filename, file_hash)
+        
+        if self._registry is not None:
+            self._registry.upsert(file_hash, filename, chunk_count)
+        self._files.add(file_hash, filename, chunk_count)
+        
+        self._invalidate_corpus_caches()
+    
+    def _invalidate_corpus_caches(self):
+        """Drop cached answers and code lookups that may no longer reflect the corpus."""
+        self._answer_cache.clear()
+        self._code_cache.clear()
+    
+    def delete_stale_chunks(self, filename: str, file_hash: str):
+        """Delete chunks of `filename` that belong to any version other than `file_hash`."""
+        if self.qdrant is not None:
+            self.qdrant.delete(
                 collection_name=self.COLLECTION_NAME,
-                points=batch
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="filename",
+                                match=models.MatchValue(value=filename)
+                            )
+                        ],
+                        must_not=[
+                            models.FieldCondition(
+                                key="file_hash",
+                                match=models.MatchValue(value=file_hash)
+                            )
+                        ]
+                    )
+                )
+            )
+        if self._local_index is not None:
+            self._local_index.delete(
+                self._local_index.ids_where({"filename": filename}, {"file_hash": file_hash})
             )
         
-        # Track file hash
-        if chunks:
-            self._ingested_hashes.add(chunks[0]['file_hash'])
+        stale = self._files.keys_for(filename) - {file_hash}
+        self._files.remove(stale)
+        if self._registry is not None:
+            self._registry.delete(stale)
+        if stale:
+            print(f"Replaced {len(stale)} previous version(s) of {filename}")
+    
+    def delete_file(self, filename: str) -> int:
+        """Delete every chunk of a file, e.g. after it was removed from the docs folder."""
+        if not self._available:
+            raise Exception("Qdrant service not available")
         
-        print(f"Ingested {len(points)} chunks")
-        return len(points)
+        if self.qdrant is not None:
+            self.qdrant.delete(
+                collection_name=self.COLLECTION_NAME,
+                points_selector=models.FilterSelector(
+                    filter=models.Filter(
+                        must=[
+                            models.FieldCondition(
+                                key="filename",
+                                match=models.MatchValue(value=filename)
+                            )
+                        ]
+                    )
+                )
+            )
+        if self._local_index is not None:
+            self._local_index.delete(self._local_index.ids_where({"filename": filename}))
+        
+        removed = self._files.keys_for(filename)
+        self._files.remove(removed)
+        if self._registry is not None:
+            self._registry.delete(removed)
+        self._invalidate_corpus_caches()
+        print(f"Deleted chunks for {filename}")
+        return len(removed)
     
     def search(
         self,
@@ -167,48 +843,399 @@ class QdrantRAGService:
     ) -> List[Dict[str, Any]]:
         """Search for relevant chunks."""
         query_embedding = self._embed_text(query)
+        return self._search_vector(
+            query_embedding, limit, asset_category, filename, codes=self._query_codes(query)
+        )
+    
+    async def asearch(
+        self,
+        query: str,
+        limit: int = 5,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for relevant chunks without blocking the event loop."""
+        if not self._async_search_ready():
+            return await self._run_in_executor(
+                self.search, query, limit, asset_category, filename
+            )
         
-        # Build filter
-        filter_conditions = []
+        query_embedding = await self._aembed_text(query)
+        return await self._asearch_vector(
+            query_embedding, limit, asset_category, filename, codes=self._query_codes(query)
+        )
+    
+    def search_batch(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Search many queries with one encode call and one Qdrant batch query.
         
-        # if asset_category:
-        #     filter_conditions.append(
-        #         models.FieldCondition(
-        #             key="asset_category",
-        #             match=models.MatchValue(value=asset_category)
-        #         )
-        #     )
+        Each item takes the arguments of `search`. Results are in input order,
+        either {"results": [...]} or {"error": "..."}.
+        """
+        if not queries:
+            return []
+        self._maybe_reconnect()
+        embeddings = self.embed_queries([item["query"] for item in queries])
+        return self._search_many(queries, embeddings)
+    
+    async def asearch_batch(self, queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Async variant of search_batch."""
+        if not queries:
+            return []
+        if not self._async_search_ready():
+            return await self._run_in_executor(self.search_batch, queries)
+        self._maybe_reconnect()
         
-        if filename:
-            filter_conditions.append(
-                models.FieldCondition(
-                    key="filename",
-                    match=models.MatchValue(value=filename)
+        embeddings = await self.aembed_many([item["query"] for item in queries])
+        return await self._asearch_many(queries, embeddings)
+    
+    async def aembed_many(self, texts: List[str]) -> List[List[float]]:
+        """Embed many texts, encoding all cache misses in a single call."""
+        embeddings = [self._embedding_cache.get(text) for text in texts]
+        missing = list(dict.fromkeys(
+            text for text, embedding in zip(texts, embeddings) if embedding is None
+        ))
+        if not missing:
+            return embeddings
+        
+        computed = dict(zip(missing, await self._run_in_executor(self._encode, missing)))
+        for text, embedding in computed.items():
+            self._embedding_cache.put(text, embedding)
+        return [
+            embedding if embedding is not None else computed[text]
+            for text, embedding in zip(texts, embeddings)
+        ]
+    
+    def _search_many(
+        self,
+        queries: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> List[Dict[str, Any]]:
+        if self._serve_locally():
+            return self._local_search_many(queries, embeddings)
+        try:
+            responses = self._qdrant_read(
+                self.qdrant.query_batch_points,
+                collection_name=self.COLLECTION_NAME,
+                requests=self._batch_requests(queries, embeddings)
+            )
+        except Exception as e:
+            if self._local_index is not None:
+                return self._local_search_many(queries, embeddings)
+            return [{"error": str(e)} for _ in queries]
+        
+        results = []
+        for item, response in zip(queries, responses):
+            hits = self._format_hits(response.points)
+            codes = self._query_codes(item["query"])
+            try:
+                if codes:
+                    exact_hits = self._exact_hits(codes, item.get("asset_category"), item.get("filename"))
+                    hits = self._merge_hits(exact_hits, hits, item.get("limit", 5))
+                results.append({"results": hits})
+            except Exception as e:
+                results.append({"error": str(e)})
+        return results
+    
+    async def _asearch_many(
+        self,
+        queries: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> List[Dict[str, Any]]:
+        if self._serve_locally():
+            return self._local_search_many(queries, embeddings)
+        try:
+            responses = await self._aqdrant_read(
+                self.async_qdrant.query_batch_points,
+                collection_name=self.COLLECTION_NAME,
+                requests=self._batch_requests(queries, embeddings)
+            )
+        except Exception as e:
+            if self._local_index is not None:
+                return self._local_search_many(queries, embeddings)
+            return [{"error": str(e)} for _ in queries]
+        
+        async def merge(item: Dict[str, Any], response) -> Dict[str, Any]:
+            hits = self._format_hits(response.points)
+            codes = self._query_codes(item["query"])
+            try:
+                if codes:
+                    exact_hits = await self._aexact_hits(
+                        codes, item.get("asset_category"), item.get("filename")
+                    )
+                    hits = self._merge_hits(exact_hits, hits, item.get("limit", 5))
+                return {"results": hits}
+            except Exception as e:
+                return {"error": str(e)}
+        
+        return await asyncio.gather(*(
+            merge(item, response) for item, response in zip(queries, responses)
+        ))
+    
+    def _local_search_many(
+        self,
+        queries: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> List[Dict[str, Any]]:
+        results = []
+        for item, embedding in zip(queries, embeddings):
+            try:
+                hits = self._local_search(
+                    embedding,
+                    item.get("limit", 5),
+                    item.get("asset_category"),
+                    item.get("filename"),
+                    codes=self._query_codes(item["query"])
                 )
+                results.append({"results": hits})
+            except Exception as e:
+                results.append({"error": str(e)})
+        return results
+    
+    def _batch_requests(
+        self,
+        queries: List[Dict[str, Any]],
+        embeddings: List[List[float]]
+    ) -> List[models.QueryRequest]:
+        return [
+            models.QueryRequest(
+                query=embedding,
+                limit=item.get("limit", 5),
+                filter=self._build_filter(item.get("asset_category"), item.get("filename")),
+                params=self._search_params,
+                with_payload=True
             )
+            for item, embedding in zip(queries, embeddings)
+        ]
+    
+    def _search_vector(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None,
+        codes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Search for chunks near an already computed query embedding.
         
-        search_filter = None
-        if filter_conditions:
-            search_filter = models.Filter(must=filter_conditions)
+        Chunks containing any of `codes` exactly are placed ahead of the
+        vector results.
+        """
+        if self._serve_locally():
+            return self._local_search(query_embedding, limit, asset_category, filename, codes)
         
         # Use query_points instead of search (newer API)
-        results = self.qdrant.query_points(
+        try:
+            results = self._qdrant_read(
+                self.qdrant.query_points,
+                collection_name=self.COLLECTION_NAME,
+                query=query_embedding,
+                limit=limit,
+                query_filter=self._build_filter(asset_category, filename),
+                with_payload=True,
+                search_params=self._search_params
+            )
+        except Exception as e:
+            if self._local_index is None:
+                raise
+            print(f"Qdrant search failed, using local index: {e}")
+            return self._local_search(query_embedding, limit, asset_category, filename, codes)
+        hits = self._format_hits(results.points)
+        
+        if not codes:
+            return hits
+        exact_hits = self._exact_hits(codes, asset_category, filename)
+        return self._merge_hits(exact_hits, hits, limit)
+    
+    async def _asearch_vector(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None,
+        codes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """Async variant of _search_vector."""
+        if self._serve_locally():
+            # Sub-millisecond for the corpus sizes the local index is meant for
+            return self._local_search(query_embedding, limit, asset_category, filename, codes)
+        
+        vector_search = self._aqdrant_read(
+            self.async_qdrant.query_points,
             collection_name=self.COLLECTION_NAME,
             query=query_embedding,
             limit=limit,
-            query_filter=search_filter,
-            with_payload=True
+            query_filter=self._build_filter(asset_category, filename),
+            with_payload=True,
+            search_params=self._search_params
+        )
+        
+        try:
+            if not codes:
+                results = await vector_search
+                return self._format_hits(results.points)
+            
+            results, exact_hits = await asyncio.gather(
+                vector_search,
+                self._aexact_hits(codes, asset_category, filename)
+            )
+        except Exception as e:
+            if self._local_index is None:
+                raise
+            print(f"Qdrant search failed, using local index: {e}")
+            return self._local_search(query_embedding, limit, asset_category, filename, codes)
+        return self._merge_hits(exact_hits, self._format_hits(results.points), limit)
+    
+    def _local_search(
+        self,
+        query_embedding: List[float],
+        limit: int = 5,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None,
+        codes: Optional[List[str]] = None
+    ) -> List[Dict[str, Any]]:
+        """_search_vector against the local vector index."""
+        filters = {"asset_category": asset_category, "filename": filename}
+        hits = self._format_hits(self._local_index.search(query_embedding, limit, filters))
+        if not codes:
+            return hits
+        
+        points = self._local_index.find({**filters, "codes": codes}, settings.CODE_INDEX_MAX_HITS * 4)
+        return self._merge_hits(self._rank_exact_hits(points, codes), hits, limit)
+    
+    def _query_codes(self, text: str) -> List[str]:
+        """Error codes and part numbers in a query that should be matched exactly."""
+        if not settings.CODE_INDEX_ENABLED:
+            return []
+        return extract_codes(text)
+    
+    def _exact_hits(
+        self,
+        codes: List[str],
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Chunks whose indexed codes include any of `codes`."""
+        key = AnswerCache.make_scope(filename, asset_category, codes)
+        hits = self._code_cache.get(key)
+        if hits is None:
+            points, _ = self._qdrant_read(
+                self.qdrant.scroll,
+                collection_name=self.COLLECTION_NAME,
+                scroll_filter=self._code_filter(codes, asset_category, filename),
+                limit=settings.CODE_INDEX_MAX_HITS * 4,
+                with_payload=True,
+                with_vectors=False
+            )
+            hits = self._rank_exact_hits(points, codes)
+            self._code_cache.put(key, hits)
+        return hits
+    
+    async def _aexact_hits(
+        self,
+        codes: List[str],
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Async variant of _exact_hits."""
+        key = AnswerCache.make_scope(filename, asset_category, codes)
+        hits = self._code_cache.get(key)
+        if hits is None:
+            points, _ = await self._aqdrant_read(
+                self.async_qdrant.scroll,
+                collection_name=self.COLLECTION_NAME,
+                scroll_filter=self._code_filter(codes, asset_category, filename),
+                limit=settings.CODE_INDEX_MAX_HITS * 4,
+                with_payload=True,
+                with_vectors=False
+            )
+            hits = self._rank_exact_hits(points, codes)
+            self._code_cache.put(key, hits)
+        return hits
+    
+    def _code_filter(
+        self,
+        codes: List[str],
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> models.Filter:
+        code_filter = self._build_filter(asset_category, filename) or models.Filter(must=[])
+        code_filter.must.append(
+            models.FieldCondition(
+                key="codes",
+                match=models.MatchAny(any=codes)
+            )
+        )
+        return code_filter
+    
+    def _rank_exact_hits(self, points, codes: List[str]) -> List[Dict[str, Any]]:
+        """Order exact hits by how many of the query's codes they contain."""
+        wanted = set(codes)
+        ranked = sorted(
+            points,
+            key=lambda point: len(wanted.intersection(point.payload.get("codes", []))),
+            reverse=True
         )
+        return self._format_hits(ranked[:settings.CODE_INDEX_MAX_HITS], score=1.0)
+    
+    @staticmethod
+    def _merge_hits(
+        exact_hits: List[Dict[str, Any]],
+        vector_hits: List[Dict[str, Any]],
+        limit: int
+    ) -> List[Dict[str, Any]]:
+        """Exact code hits first, then vector hits that are not already included."""
+        seen = {(hit["filename"], hit["text"]) for hit in exact_hits}
+        merged = list(exact_hits)
+        for hit in vector_hits:
+            if (hit["filename"], hit["text"]) not in seen:
+                merged.append(hit)
+        return merged[:limit]
+    
+    def _build_filter(
+        self,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Optional[models.Filter]:
+        """Build the Qdrant payload filter for a search."""
+        filter_conditions = []
+        
+        if asset_category:
+            filter_conditions.append(
+                models.FieldCondition(
+                    key="asset_category",
+                    match=models.MatchValue(value=asset_category)
+                )
+            )
         
+        if filename:
+            filter_conditions.append(
+                models.FieldCondition(
+                    key="filename",
+                    match=models.MatchValue(value=filename)
+                )
+            )
+        
+        if not filter_conditions:
+            return None
+        return models.Filter(must=filter_conditions)
+    
+    def _format_hits(self, points, score: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Convert Qdrant points into search result dicts (`score` overrides hit scores)."""
         return [
             {
                 "text": hit.payload.get("text", ""),
                 "filename": hit.payload.get("filename", ""),
                 "asset_category": hit.payload.get("asset_category", ""),
                 "doc_type": hit.payload.get("doc_type", ""),
-                "score": hit.score
+                "score": hit.score if score is None else score,
+                "file_hash": hit.payload.get("file_hash"),
+                "chunk_id": hit.payload.get("chunk_id"),
+                "start_char": hit.payload.get("start_char"),
+                "end_char": hit.payload.get("end_char"),
+                "page_start": hit.payload.get("page_start"),
+                "page_end": hit.payload.get("page_end"),
             }
-            for hit in results.points
+            for hit in points
         ]
     
     def query_with_llm(
@@ -218,29 +1245,271 @@ class QdrantRAGService:
         filename: Optional[str] = None
     ) -> Dict[str, Any]:
         """Query with RAG - search + LLM generation."""
+        query_embedding = self._embed_text(question)
+        
+        # Near-duplicate questions in the same scope reuse a previous answer
+        scope = AnswerCache.make_scope(filename, asset_category, self._query_codes(question))
+        cached = self._answer_cache.lookup(query_embedding, scope)
+        if cached is not None:
+            return cached
+        generation = self._answer_cache.generation
         
         # Search for relevant context
-        search_results = self.search(
-            query=question,
+        search_results = self._search_vector(
+            query_embedding,
             limit=5,
             asset_category=asset_category,
-            filename=filename
+            filename=filename,
+            codes=self._query_codes(question)
         )
         
         if not search_results:
-            return {
-                "answer": "I don't have any relevant documentation to answer your question. Please make sure the relevant equipment manuals have been ingested.",
-                "sources": []
-            }
+            return {"answer": self.NO_CONTEXT_ANSWER, "sources": []}
+        
+        messages, context_parts, sources = self._build_rag_prompt(question, search_results)
+        
+        # Call OpenAI
+        try:
+            response = self._openai_breaker.call(
+                self.openai_client.chat.completions.create,
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=1000
+            )
+            
+            answer = response.choices[0].message.content
+        except Exception as e:
+            print(f"OpenAI API error: {e}")
+            return {"answer": self._fallback_answer(context_parts), "sources": sources}
+        
+        result = {"answer": answer, "sources": sources}
+        self._answer_cache.store(query_embedding, scope, result, generation)
+        return result
+    
+    async def aquery_with_llm(
+        self,
+        question: str,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Query with RAG without blocking the event loop."""
+        if self.async_openai_client is None or not self._async_search_ready():
+            return await self._run_in_executor(
+                self.query_with_llm, question, asset_category, filename
+            )
+        
+        query_embedding = await self._aembed_text(question)
+        
+        scope = AnswerCache.make_scope(filename, asset_category, self._query_codes(question))
+        cached = self._answer_cache.lookup(query_embedding, scope)
+        if cached is not None:
+            return cached
+        generation = self._answer_cache.generation
+        
+        search_results = await self._asearch_vector(
+            query_embedding,
+            limit=5,
+            asset_category=asset_category,
+            filename=filename,
+            codes=self._query_codes(question)
+        )
+        
+        return await self._agenerate_answer(
+            question, search_results, query_embedding, scope, generation
+        )
+    
+    async def _agenerate_answer(
+        self,
+        question: str,
+        search_results: List[Dict[str, Any]],
+        query_embedding: List[float],
+        scope: Scope,
+        generation: int
+    ) -> Dict[str, Any]:
+        """Ask the LLM to answer from the search results and cache the answer."""
+        if not search_results:
+            return {"answer": self.NO_CONTEXT_ANSWER, "sources": []}
+        
+        messages, context_parts, sources = self._build_rag_prompt(question, search_results)
+        
+        try:
+            response = await self._openai_breaker.acall(
+                self.async_openai_client.chat.completions.create,
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=1000
+            )
+            
+            answer = response.choices[0].message.content
+        except Exception as e:
+            print(f"OpenAI API error: {e}")
+            return {"answer": self._fallback_answer(context_parts), "sources": sources}
+        
+        result = {"answer": answer, "sources": sources}
+        self._answer_cache.store(query_embedding, scope, result, generation)
+        return result
+    
+    async def aquery_batch(
+        self,
+        questions: List[Dict[str, Any]],
+        concurrency: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """Answer many questions: one encode call, one batch search, bounded LLM fan-out.
+        
+        Each item takes the arguments of `query_with_llm`. Results are in
+        input order, either {"answer", "sources"} or {"error"}.
+        """
+        semaphore = asyncio.Semaphore(concurrency or settings.BATCH_LLM_CONCURRENCY)
+        results: List[Optional[Dict[str, Any]]] = [None] * len(questions)
+        
+        if self.async_openai_client is None or not self._async_search_ready():
+            async def answer_one(i: int, item: Dict[str, Any]):
+                async with semaphore:
+                    try:
+                        results[i] = await self.aquery_with_llm(**item)
+                    except Exception as e:
+                        results[i] = {"error": str(e)}
+            
+            await asyncio.gather(*(answer_one(i, item) for i, item in enumerate(questions)))
+            return results
+        
+        embeddings = await self.aembed_many([item["question"] for item in questions])
+        
+        pending = []
+        for i, (item, embedding) in enumerate(zip(questions, embeddings)):
+            scope = AnswerCache.make_scope(
+                item.get("filename"), item.get("asset_category"), self._query_codes(item["question"])
+            )
+            cached = self._answer_cache.lookup(embedding, scope)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, scope))
+        if not pending:
+            return results
+        generation = self._answer_cache.generation
+        
+        searches = await self._asearch_many(
+            [
+                {
+                    "query": questions[i]["question"],
+                    "limit": 5,
+                    "asset_category": questions[i].get("asset_category"),
+                    "filename": questions[i].get("filename"),
+                }
+                for i, _ in pending
+            ],
+            [embeddings[i] for i, _ in pending]
+        )
+        
+        async def generate(i: int, scope: Scope, search: Dict[str, Any]):
+            if "error" in search:
+                results[i] = search
+                return
+            async with semaphore:
+                try:
+                    results[i] = await self._agenerate_answer(
+                        questions[i]["question"], search["results"], embeddings[i], scope, generation
+                    )
+                except Exception as e:
+                    results[i] = {"error": str(e)}
+        
+        await asyncio.gather(*(
+            generate(i, scope, search) for (i, scope), search in zip(pending, searches)
+        ))
+        return results
+    
+    async def astream_query_with_llm(
+        self,
+        question: str,
+        asset_category: Optional[str] = None,
+        filename: Optional[str] = None
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Query with RAG, yielding the sources first and then answer tokens.
+        
+        Yields events of the form {"event": "sources" | "token" | "done", "data": ...}.
+        """
+        if self.async_openai_client is None or not self._async_search_ready():
+            result = await self.aquery_with_llm(question, asset_category, filename)
+            yield {"event": "sources", "data": result["sources"]}
+            yield {"event": "token", "data": result["answer"]}
+            yield {"event": "done", "data": None}
+            return
+        
+        query_embedding = await self._aembed_text(question)
+        
+        scope = AnswerCache.make_scope(filename, asset_category, self._query_codes(question))
+        cached = self._answer_cache.lookup(query_embedding, scope)
+        if cached is not None:
+            yield {"event": "sources", "data": cached["sources"]}
+            yield {"event": "token", "data": cached["answer"]}
+            yield {"event": "done", "data": None}
+            return
+        generation = self._answer_cache.generation
+        
+        search_results = await self._asearch_vector(
+            query_embedding,
+            limit=5,
+            asset_category=asset_category,
+            filename=filename,
+            codes=self._query_codes(question)
+        )
+        
+        if not search_results:
+            yield {"event": "sources", "data": []}
+            yield {"event": "token", "data": self.NO_CONTEXT_ANSWER}
+            yield {"event": "done", "data": None}
+            return
+        
+        messages, context_parts, sources = self._build_rag_prompt(question, search_results)
+        yield {"event": "sources", "data": sources}
+        
+        tokens = []
+        try:
+            stream = await self._openai_breaker.acall(
+                self.async_openai_client.chat.completions.create,
+                model=settings.OPENAI_MODEL,
+                messages=messages,
+                temperature=0.3,
+                max_tokens=1000,
+                stream=True
+            )
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                token = chunk.choices[0].delta.content
+                if token:
+                    tokens.append(token)
+                    yield {"event": "token", "data": token}
+        except Exception as e:
+            print(f"OpenAI API error: {e}")
+            if not tokens:
+                yield {"event": "token", "data": self._fallback_answer(context_parts)}
+            else:
+                yield {"event": "error", "data": "Response generation was interrupted"}
+        else:
+            self._answer_cache.store(
+                query_embedding, scope, {"answer": "".join(tokens), "sources": sources}, generation
+            )
         
-        # Build context
-        context_parts = []
+        yield {"event": "done", "data": None}
+    
+    def _build_rag_prompt(
+        self,
+        question: str,
+        search_results: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, str]], List[str], List[Dict[str, str]]]:
+        """Build the chat messages, context parts and sources for a question."""
+        context_parts = [
+            f"[From {passage['filename']}]:\n{passage['text']}"
+            for passage in self._context_packer.pack(search_results)
+        ]
         sources = []
         seen_files = set()
         
         for result in search_results:
-            context_parts.append(f"[From {result['filename']}]:\n{result['text']}")
-            
             if result['filename'] not in seen_files:
                 sources.append({
                     "filename": result['filename'],
@@ -251,24 +1520,6 @@ class QdrantRAGService:
         
         context = "\n\n---\n\n".join(context_parts)
         
-        # Build prompt
-        system_prompt = """You are a helpful retail equipment support assistant. Your role is to help users troubleshoot equipment issues, find maintenance procedures, understand error codes, and provide guidance based on equipment documentation.
-
-Guidelines:
-- For greetings (hi, hello, hey, etc.) or casual conversation, respond briefly and friendly without diving into technical details. Simply greet back and ask how you can help.
-- Only provide technical guidance when the user asks a specific question about equipment.
-- Provide clear, step-by-step instructions when applicable
-- If the documentation mentions safety warnings, always include them
-- If you're not sure about something, say so rather than guessing
-- Reference specific error codes or procedures when mentioned in the documentation
-- Be concise and to the point, brief the answers to max of 5 pointed steps. Each step should be of 1 short sentence.
-- Even if the documentation doesn't contain relevant information to answer the question, there is no need to let the user know that documentation. You can suggest from overall understanding of retail equipment.
-
-Examples:
-- User: "Hi" → Response: "Hello! How can I help you with your equipment today?"
-- User: "Hey there" → Response: "Hi! What can I assist you with?"
-- User: "Coffee machine not working" → Provide troubleshooting steps"""
-
         user_prompt = f"""Based on the following documentation excerpts, please answer the user's question.
 
 DOCUMENTATION:
@@ -278,66 +1529,56 @@ USER QUESTION: {question}
 
 Please provide a helpful response based on the documentation above. If the documentation doesn't contain relevant information to answer the question, let the user know."""
 
-        # Call OpenAI
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=1000
-            )
-            
-            answer = response.choices[0].message.content
-        except Exception as e:
-            print(f"OpenAI API error: {e}")
-            answer = f"I found relevant documentation but encountered an error generating a response. Here's a summary of what I found:\n\n{context_parts[0][:500]}..."
+        messages = [
+            {"role": "system", "content": self.RAG_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ]
+        return messages, context_parts, sources
+    
+    def _fallback_answer(self, context_parts: List[str]) -> str:
+        """Extractive answer used when the LLM call fails."""
+        return f"I found relevant documentation but encountered an error generating a response. Here's a summary of what I found:\n\n{context_parts[0][:500]}..."
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get collection statistics from the in-memory corpus counters."""
+        if not self._available:
+            return {"error": "Qdrant service not available"}
         
         return {
-            "answer": answer,
-            "sources": sources
+            **self._files.stats(),
+            "collection_name": self.COLLECTION_NAME,
+            "collection_version": self._collection_version
         }
     
-    def get_stats(self) -> Dict[str, Any]:
-        """Get collection statistics."""
-        try:
-            collection_info = self.qdrant.get_collection(self.COLLECTION_NAME)
-            
-            # Get unique filenames
-            unique_files = set()
-            offset = None
-            while True:
-                results = self.qdrant.scroll(
-                    collection_name=self.COLLECTION_NAME,
-                    limit=100,
-                    offset=offset,
-                    with_payload=["filename"],
-                    with_vectors=False
-                )
-                
-                points, offset = results
-                for point in points:
-                    if point.payload and 'filename' in point.payload:
-                        unique_files.add(point.payload['filename'])
-                
-                if offset is None:
-                    break
-            
-            return {
-                "total_chunks": collection_info.points_count,
-                "total_files": len(unique_files),
-                "collection_name": self.COLLECTION_NAME
-            }
-        except Exception as e:
-            return {"error": str(e)}
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """Get query-path cache and batching statistics."""
+        stats = {
+            "embedding_cache": self._embedding_cache.get_stats(),
+            "answer_cache": self._answer_cache.get_stats(),
+            "code_lookup_cache": self._code_cache.get_stats(),
+        }
+        if self._embedding_batcher is not None:
+            stats["embedding_batcher"] = self._embedding_batcher.get_stats()
+        if self._embedding_store is not None:
+            stats["embedding_store"] = self._embedding_store.get_stats()
+        stats["circuit_breakers"] = {
+            "qdrant": self._qdrant_breaker.get_stats(),
+            "openai": self._openai_breaker.get_stats(),
+        }
+        return stats
     
     def delete_collection(self):
         """Delete the collection."""
-        self.qdrant.delete_collection(self.COLLECTION_NAME)
-        self._ingested_hashes.clear()
-        self._ensure_collection()
+        if self.qdrant is not None:
+            collection_aliases.drop(self.qdrant, self.COLLECTION_NAME)
+            self._registry.drop()
+        if self._local_index is not None:
+            self._local_index.clear()
+        self._files.clear()
+        self._invalidate_corpus_caches()
+        if self.qdrant is not None:
+            self._ensure_collection()
+            self._registry.ensure()
     
     def summarize_chat(self, messages: List[Dict[str, str]]) -> str:
         """Summarize a chat conversation."""
@@ -345,6 +1586,39 @@ Please provide a helpful response based on the documentation above. If the docum
             # Fallback: just concatenate last messages
             return "\n".join([f"{m['role']}: {m['content']}" for m in messages[-10:]])
         
+        try:
+            response = self._openai_breaker.call(
+                self.openai_client.chat.completions.create,
+                model=settings.OPENAI_MODEL,
+                messages=self._build_summary_prompt(messages),
+                temperature=0.3,
+                max_tokens=300
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Summarization error: {e}")
+            return "\n".join([f"{m['role']}: {m['content']}" for m in messages[-5:]])
+    
+    async def asummarize_chat(self, messages: List[Dict[str, str]]) -> str:
+        """Summarize a chat conversation without blocking the event loop."""
+        if not self._available or not self.async_openai_client:
+            return await self._run_in_executor(self.summarize_chat, messages)
+        
+        try:
+            response = await self._openai_breaker.acall(
+                self.async_openai_client.chat.completions.create,
+                model=settings.OPENAI_MODEL,
+                messages=self._build_summary_prompt(messages),
+                temperature=0.3,
+                max_tokens=300
+            )
+            return response.choices[0].message.content
+        except Exception as e:
+            print(f"Summarization error: {e}")
+            return "\n".join([f"{m['role']}: {m['content']}" for m in messages[-5:]])
+    
+    def _build_summary_prompt(self, messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Build the chat messages for a conversation summary."""
         # Format chat history
         chat_history = "\n".join([
             f"{'User' if m['role'] == 'user' else 'Assistant'}: {m['content']}"
@@ -363,17 +1637,7 @@ Keep the summary under 200 words and focus on actionable information."""
 
 {chat_history}"""
 
-        try:
-            response = self.openai_client.chat.completions.create(
-                model=settings.OPENAI_MODEL,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.3,
-                max_tokens=300
-            )
-            return response.choices[0].message.content
-        except Exception as e:
-            print(f"Summarization error: {e}")
-            return "\n".join([f"{m['role']}: {m['content']}" for m in messages[-5:]])
\ No newline at end of file
+        return [
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": user_prompt}
+        ]
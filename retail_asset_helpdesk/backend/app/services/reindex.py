@@ -0,0 +1,141 @@
+from typing import Any, Dict, List, Optional
+
+from qdrant_client.http.models import PointStruct
+
+from app.core.config import settings
+from app.services import collection_aliases
+from app.services.document_processor import DocumentProcessor
+from app.services.file_registry import FileRegistry, IngestedFiles
+from app.services.ingest_pipeline import IngestPipeline, IngestRun
+from app.services.qdrant_service import QdrantRAGService
+
+
+def drop_version(qdrant, collection_name: str):
+    """Delete a versioned collection and its file registry, logging failures."""
+    try:
+        collection_aliases.drop(qdrant, collection_name)
+        collection_aliases.drop(qdrant, f"{collection_name}_files")
+    except Exception as e:
+        print(f"Error dropping collection {collection_name}: {e}")
+
+
+def swap_in(rag_service: QdrantRAGService, collection_name: str, drop_previous: bool) -> Optional[str]:
+    """Serve a fully built collection through the alias; returns the previous one."""
+    previous = rag_service.activate_collection(collection_name)
+    print(f"✅ {rag_service.COLLECTION_NAME} now serves {collection_name}")
+    
+    if previous and previous != collection_name and drop_previous:
+        drop_version(rag_service.qdrant, previous)
+        print(f"Dropped previous collection {previous}")
+    return previous
+
+
+class ShadowCollection:
+    """Write target for a pipeline run that builds a new collection.
+    
+    Embeds through the live service (sharing its model and embedding store)
+    but upserts into `collection_name` and records files in that collection's
+    own registry, so the live collection is never touched.
+    """
+    
+    def __init__(self, rag_service: QdrantRAGService, collection_name: str):
+        self.rag_service = rag_service
+        self.collection_name = collection_name
+        self.registry = FileRegistry(rag_service.qdrant, f"{collection_name}_files")
+        self._files = IngestedFiles()
+    
+    @property
+    def total_chunks(self) -> int:
+        return self._files.stats()["total_chunks"]
+    
+    def is_file_ingested(self, file_key: str) -> bool:
+        return file_key in self._files
+    
+    def embed_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.rag_service.embed_batch(texts)
+    
+    def build_points(self, chunks: List[Dict[str, Any]], embeddings: List[List[float]]) -> List[PointStruct]:
+        return self.rag_service.build_points(chunks, embeddings)
+    
+    def upsert_points(self, points: List[PointStruct]):
+        self.rag_service.qdrant.upsert(collection_name=self.collection_name, points=points)
+    
+    def mark_file_ingested(self, file_key: str, filename: str, chunk_count: int):
+        self.registry.upsert(file_key, filename, chunk_count)
+        self._files.add(file_key, filename, chunk_count)
+
+
+class Reindexer:
+    """Blue/green rebuild of the collection served behind the QDRANT_COLLECTION alias.
+    
+    Ingests the whole docs folder into a new versioned collection with the
+    current embedding, chunking and quantization settings while the live
+    collection keeps answering queries. Once the new collection is complete
+    and verified, the alias (and the registry alias) switch to it in one
+    atomic call; on any failure the new collection is dropped instead.
+    
+    The rebuild always uses this process's embedding model, which is also
+    the one encoding queries, so it cannot switch models with zero
+    downtime: changing EMBEDDING_MODEL needs a restart, and the old
+    collection is not searchable with the new model until the reindex
+    swaps in.
+    """
+    
+    def __init__(
+        self,
+        doc_processor: DocumentProcessor,
+        rag_service: QdrantRAGService,
+        drop_previous: Optional[bool] = None
+    ):
+        self.doc_processor = doc_processor
+        self.rag_service = rag_service
+        self.drop_previous = settings.REINDEX_DROP_PREVIOUS if drop_previous is None else drop_previous
+    
+    def run(self, run: IngestRun) -> str:
+        """Build, verify and activate a new collection; returns its name."""
+        qdrant = self.rag_service.qdrant
+        if qdrant is None:
+            raise Exception("Qdrant service not available")
+        
+        alias = self.rag_service.COLLECTION_NAME
+        collection_name = collection_aliases.versioned_name(qdrant, alias)
+        print(f"Reindexing {alias} into {collection_name}")
+        
+        shadow = ShadowCollection(self.rag_service, collection_name)
+        try:
+            self.rag_service.create_collection(collection_name)
+            shadow.registry.ensure()
+            pipeline = IngestPipeline(self.doc_processor, shadow)
+            pipeline.run(self.doc_processor.get_all_documents(), run=run)
+            self._verify(shadow, run)
+        except Exception:
+            drop_version(qdrant, collection_name)
+            raise
+        
+        swap_in(self.rag_service, collection_name, self.drop_previous)
+        return collection_name
+    
+    def _verify(self, shadow: ShadowCollection, run: IngestRun):
+        """Refuse to activate a collection that is incomplete or unsearchable."""
+        if run.errors:
+            raise Exception(f"{len(run.errors)} files failed to ingest; keeping the current collection")
+        
+        qdrant = self.rag_service.qdrant
+        count = qdrant.count(shadow.collection_name, exact=True).count
+        if count == 0:
+            raise Exception("New collection is empty; keeping the current collection")
+        if count != shadow.total_chunks:
+            raise Exception(
+                f"New collection has {count} points but {shadow.total_chunks} chunks "
+                f"were recorded; keeping the current collection"
+            )
+        
+        # The collection must answer a query before it takes traffic
+        probe = self.rag_service.embed_queries(["equipment troubleshooting"])[0]
+        hits = qdrant.query_points(
+            collection_name=shadow.collection_name,
+            query=probe,
+            limit=1
+        ).points
+        if not hits:
+            raise Exception("New collection returned no search results; keeping the current collection")
@@ -0,0 +1,186 @@
+import asyncio
+import random
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import httpx
+import openai
+from qdrant_client.http.exceptions import ResponseHandlingException, UnexpectedResponse
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose circuit breaker is open."""
+
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether an error means the dependency is unreachable or overloaded (worth retrying)."""
+    if isinstance(error, (CircuitOpenError, ConnectionError, TimeoutError, httpx.TransportError)):
+        return True
+    
+    # qdrant-client wraps transport failures and reports HTTP errors with a status code
+    if isinstance(error, ResponseHandlingException):
+        return True
+    if isinstance(error, UnexpectedResponse):
+        return error.status_code == 429 or error.status_code >= 500
+    
+    # APIConnectionError covers timeouts
+    return isinstance(error, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError))
+
+
+class CircuitBreaker:
+    """Fail fast while a dependency keeps failing.
+    
+    After `failure_threshold` consecutive transient failures the circuit
+    opens and calls raise `CircuitOpenError` without touching the
+    dependency. After `reset_timeout` seconds one trial call is let through
+    (half-open); its success closes the circuit, its failure re-opens it.
+    Errors that are not transient (bad requests) don't count as failures.
+    """
+    
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._state = "closed"
+        self.rejected = 0
+        self.times_opened = 0
+    
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return "half_open"
+            return self._state
+    
+    def allow(self) -> bool:
+        """Whether a call may go through now (claims the trial call when half-open)."""
+        if self.failure_threshold <= 0:
+            return True
+        with self._lock:
+            if self._state == "closed":
+                return True
+            if self._state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._state = "half_open"
+                return True
+            self.rejected += 1
+            return False
+    
+    def record_success(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures = 0
+            self._state = "closed"
+    
+    def record_failure(self):
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if self._state == "half_open" or self._failures >= self.failure_threshold:
+                if self._state != "open":
+                    self.times_opened += 1
+                    print(f"⚠️  {self.name} circuit open after {self._failures} failures")
+                self._state = "open"
+                self._opened_at = time.monotonic()
+    
+    def _check(self):
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name} is unavailable (circuit open)")
+    
+    def _record(self, error: BaseException):
+        if not isinstance(error, Exception):
+            # Cancelled or interrupted: nothing learned about the dependency
+            self._release_trial()
+        elif is_transient_error(error):
+            self.record_failure()
+        else:
+            # The dependency answered; the request itself was bad
+            self.record_success()
+    
+    def _release_trial(self):
+        """Give back a half-open trial call that never finished, so the next call can try."""
+        with self._lock:
+            if self._state == "half_open":
+                self._state = "open"
+    
+    def call(self, func: Callable, *args, **kwargs) -> Any:
+        """Call `func` through the breaker."""
+        self._check()
+        try:
+            result = func(*args, **kwargs)
+        except BaseException as e:
+            self._record(e)
+            raise
+        self.record_success()
+        return result
+    
+    async def acall(self, func: Callable, *args, **kwargs) -> Any:
+        """Await `func(*args, **kwargs)` through the breaker."""
+        self._check()
+        try:
+            result = await func(*args, **kwargs)
+        except BaseException as e:
+            self._record(e)
+            raise
+        self.record_success()
+        return result
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self._failures,
+            "times_opened": self.times_opened,
+            "rejected_calls": self.rejected,
+        }
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff for retry `attempt` (0-based)."""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def retry_call(
+    breaker: CircuitBreaker,
+    func: Callable,
+    *args,
+    attempts: int = 3,
+    base_delay: float = 0.1,
+    max_delay: float = 1.0,
+    **kwargs
+) -> Any:
+    """Call an idempotent `func` through `breaker`, retrying transient errors with jitter."""
+    for attempt in range(attempts):
+        try:
+            return breaker.call(func, *args, **kwargs)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient_error(e):
+                raise
+        time.sleep(backoff_delay(attempt, base_delay, max_delay))
+
+
+async def aretry_call(
+    breaker: CircuitBreaker,
+    func: Callable,
+    *args,
+    attempts: int = 3,
+    base_delay: float = 0.1,
+    max_delay: float = 1.0,
+    **kwargs
+) -> Any:
+    """Async variant of retry_call; `func` returns an awaitable."""
+    for attempt in range(attempts):
+        try:
+            return await breaker.acall(func, *args, **kwargs)
+        except CircuitOpenError:
+            raise
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient_error(e):
+                raise
+        await asyncio.sleep(backoff_delay(attempt, base_delay, max_delay))
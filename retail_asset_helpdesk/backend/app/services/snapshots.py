@@ -0,0 +1,211 @@
+import gzip
+import json
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.core.config import settings
+from app.services import collection_aliases
+from app.services.embedding_backends import embedding_model_id
+from app.services.file_registry import FileRegistry
+from app.services.ingest_pipeline import POOL_START_METHOD, IngestRun
+from app.services.qdrant_service import QdrantRAGService
+from app.services.reindex import drop_version, swap_in
+
+
+SNAPSHOT_FORMAT = 1
+
+
+class SnapshotManager:
+    """Export the corpus to a portable snapshot and bulk-load it elsewhere.
+    
+    A snapshot is a directory holding `vectors.npy` (a float32 matrix),
+    `payloads.jsonl.gz` (point ID and payload per row, in matrix order),
+    `registry.json` (the ingested-file registry) and `manifest.json` (point
+    count, dimension and embedding model). Importing uploads it into a new
+    versioned collection with parallel batches and swaps the collection
+    alias over, so a fresh environment skips parsing and embedding.
+    """
+    
+    def __init__(self, rag_service: QdrantRAGService, snapshot_dir: Optional[str] = None):
+        self.rag_service = rag_service
+        self.snapshot_dir = Path(snapshot_dir or settings.SNAPSHOT_DIR)
+    
+    def path_for(self, name: str) -> Path:
+        """Resolve a snapshot name inside the snapshot directory."""
+        if not name or Path(name).name != name or name.startswith('.'):
+            raise ValueError(f"Invalid snapshot name: {name}")
+        return self.snapshot_dir / name
+    
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """Get the manifests of available snapshots, newest first."""
+        if not self.snapshot_dir.exists():
+            return []
+        snapshots = []
+        for path in self.snapshot_dir.iterdir():
+            manifest = path / "manifest.json"
+            if not manifest.exists():
+                continue
+            with open(manifest, 'r', encoding='utf-8') as f:
+                snapshots.append({"name": path.name, **json.load(f)})
+        return sorted(snapshots, key=lambda s: s.get("created_at", ""), reverse=True)
+    
+    def export(self, name: Optional[str] = None, run: Optional[IngestRun] = None) -> Path:
+        """Write the live collection and file registry to a new snapshot."""
+        qdrant = self._require_qdrant()
+        collection = self.rag_service.COLLECTION_NAME
+        created_at = datetime.now(timezone.utc)
+        name = name or f"{collection}-{created_at.strftime('%Y%m%dT%H%M%SZ')}"
+        path = self.path_for(name)
+        if path.exists():
+            raise ValueError(f"Snapshot {name} already exists")
+        
+        total = qdrant.count(collection, exact=True).count
+        tmp_path = path.with_name(f".{name}.tmp")
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        tmp_path.mkdir(parents=True)
+        
+        try:
+            # Rows are written straight into a memory-mapped .npy as pages arrive
+            vectors = np.lib.format.open_memmap(
+                tmp_path / "vectors.npy",
+                mode='w+',
+                dtype=np.float32,
+                shape=(total, settings.EMBEDDING_DIMENSION)
+            )
+            written = 0
+            offset = None
+            with gzip.open(tmp_path / "payloads.jsonl.gz", 'wt', encoding='utf-8', compresslevel=3) as f:
+                while True:
+                    points, offset = qdrant.scroll(
+                        collection_name=collection,
+                        limit=1000,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=True
+                    )
+                    if written + len(points) > total:
+                        raise Exception("Collection changed during export")
+                    for point in points:
+                        vectors[written] = point.vector
+                        f.write(json.dumps({"id": str(point.id), "payload": point.payload}) + "\n")
+                        written += 1
+                    if run is not None:
+                        run.chunks_ingested = written
+                    if offset is None:
+                        break
+            vectors.flush()
+            del vectors
+            if written != total:
+                raise Exception(f"Exported {written} of {total} points; collection changed during export")
+            
+            registry = self.rag_service.load_file_registry()
+            with open(tmp_path / "registry.json", 'w', encoding='utf-8') as f:
+                json.dump(registry, f)
+            
+            with open(tmp_path / "manifest.json", 'w', encoding='utf-8') as f:
+                json.dump({
+                    "format": SNAPSHOT_FORMAT,
+                    "created_at": created_at.isoformat(),
+                    "collection": self.rag_service.collection_version or collection,
+                    "points": total,
+                    "files": len(registry),
+                    "dimension": settings.EMBEDDING_DIMENSION,
+                    "embedding_model": embedding_model_id(),
+                }, f, indent=2)
+            
+            tmp_path.rename(path)
+        except Exception:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            raise
+        
+        print(f"Exported {total} points and {len(registry)} files to {path}")
+        return path
+    
+    def import_snapshot(self, name: str, force: bool = False, run: Optional[IngestRun] = None) -> str:
+        """Load a snapshot into a new collection and serve it; returns the collection name.
+        
+        Refuses snapshots made with a different embedding model unless `force`.
+        """
+        qdrant = self._require_qdrant()
+        path = self.path_for(name)
+        manifest = self._read_manifest(path)
+        if manifest["dimension"] != settings.EMBEDDING_DIMENSION:
+            raise ValueError(
+                f"Snapshot has {manifest['dimension']}-dim vectors, "
+                f"but EMBEDDING_DIMENSION is {settings.EMBEDDING_DIMENSION}"
+            )
+        if manifest["embedding_model"] != embedding_model_id() and not force:
+            raise ValueError(
+                f"Snapshot was embedded with {manifest['embedding_model']}, "
+                f"not {embedding_model_id()}; pass force to import anyway"
+            )
+        
+        vectors = np.load(path / "vectors.npy", mmap_mode='r')
+        if len(vectors) != manifest["points"]:
+            raise ValueError(f"Snapshot {name} is incomplete: {len(vectors)} of {manifest['points']} vectors")
+        with open(path / "registry.json", 'r', encoding='utf-8') as f:
+            registry = json.load(f)
+        
+        collection_name = collection_aliases.versioned_name(qdrant, self.rag_service.COLLECTION_NAME)
+        print(f"Importing snapshot {name} ({manifest['points']} points) into {collection_name}")
+        if run is not None:
+            run.files_total = manifest["files"]
+        
+        try:
+            self.rag_service.create_collection(collection_name)
+            qdrant.upload_collection(
+                collection_name=collection_name,
+                vectors=vectors,
+                payload=(row["payload"] for row in self._iter_rows(path)),
+                ids=(row["id"] for row in self._iter_rows(path)),
+                batch_size=settings.SNAPSHOT_UPLOAD_BATCH_SIZE,
+                parallel=settings.SNAPSHOT_UPLOAD_PARALLEL,
+                # Upload workers must not be forked from the threaded API process
+                method=POOL_START_METHOD,
+                wait=True
+            )
+            
+            registry_collection = FileRegistry(qdrant, f"{collection_name}_files")
+            registry_collection.ensure()
+            registry_collection.upsert_many(registry)
+            
+            count = qdrant.count(collection_name, exact=True).count
+            if count != manifest["points"]:
+                raise Exception(f"Imported {count} of {manifest['points']} points; keeping the current collection")
+        except Exception:
+            drop_version(qdrant, collection_name)
+            raise
+        
+        if run is not None:
+            run.chunks_ingested = count
+            run.files_done = manifest["files"]
+        
+        swap_in(self.rag_service, collection_name, settings.REINDEX_DROP_PREVIOUS)
+        return collection_name
+    
+    def _require_qdrant(self):
+        if self.rag_service.qdrant is None:
+            raise Exception("Qdrant service not available")
+        return self.rag_service.qdrant
+    
+    @staticmethod
+    def _read_manifest(path: Path) -> Dict[str, Any]:
+        try:
+            with open(path / "manifest.json", 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ValueError(f"Snapshot not found: {path.name}")
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(f"Unsupported snapshot format: {manifest.get('format')}")
+        return manifest
+    
+    @staticmethod
+    def _iter_rows(path: Path) -> Iterator[Dict[str, Any]]:
+        with gzip.open(path / "payloads.jsonl.gz", 'rt', encoding='utf-8') as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
@@ -1,5 +1,6 @@
+import json
 import re
-from typing import Optional
+from typing import Any, Optional
 from app.schemas.assets import AssetCategory
 
 
@@ -59,4 +60,9 @@ def clean_text(text: str) -> str:
     text = re.sub(r'\s+', ' ', text)
     # Remove special characters but keep punctuation
     text = re.sub(r'[^\w\s.,!?;:\-\'\"()]', '', text)
-    return text.strip()
\ No newline at end of file
+    return text.strip()
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Format a Server-Sent Events message with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
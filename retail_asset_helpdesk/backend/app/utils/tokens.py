@@ -0,0 +1,32 @@
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import tiktoken
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    tiktoken = None
+    TIKTOKEN_AVAILABLE = False
+
+
+# Rough characters per token for English text, used when tiktoken is missing
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: Optional[str] = None):
+    """Get the tiktoken encoding for a model, or None if it can't be loaded.
+    
+    tiktoken downloads the BPE file on first use, so call this lazily rather
+    than at startup; without network access the character estimate is used.
+    """
+    if not TIKTOKEN_AVAILABLE:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model or "")
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"⚠️  tiktoken encoding unavailable, estimating {CHARS_PER_TOKEN} chars per token: {e}")
+        return None
@@ -0,0 +1,145 @@
+"""Export the embedding model to ONNX and check parity with the PyTorch model.
+
+Run from the backend directory (needs torch and transformers, so run it at
+build time or on a dev machine rather than in the slim runtime image):
+    
+    python -m scripts.embedding_onnx export
+    python -m scripts.embedding_onnx parity --min-similarity 0.99
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+from app.core.config import settings
+from app.services.document_processor import DocumentProcessor
+from app.services.embedding_backends import OnnxEmbeddingBackend, SentenceTransformerBackend
+
+
+SAMPLE_TEXTS = [
+    "How do I reset the POS terminal after a power outage?",
+    "Refrigeration unit shows error code E4 and the display is blinking",
+    "The fuel pump nozzle is not dispensing and the screen is frozen",
+    "Replace the receipt printer paper roll",
+    "Coffee machine descaling procedure",
+    "Car wash conveyor stopped mid-cycle",
+    "Safety checklist before servicing high-voltage equipment",
+    "What is the warranty period for the walk-in freezer compressor?",
+]
+
+
+def export(output_dir: str, model_name: str, opset: int):
+    """Export the transformer to ONNX, save its tokenizer and write an int8 copy."""
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from transformers import AutoModel, AutoTokenizer
+    
+    if "/" not in model_name:
+        model_name = f"sentence-transformers/{model_name}"
+    
+    out = Path(output_dir)
+    out.mkdir(parents=True, exist_ok=True)
+    
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModel.from_pretrained(model_name)
+    model.eval()
+    
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    input_names = [n for n in ("input_ids", "attention_mask", "token_type_ids") if n in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+    
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[n] for n in input_names),
+            str(out / "model.onnx"),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset
+        )
+    tokenizer.save_pretrained(str(out))
+    print(f"Exported {model_name} to {out / 'model.onnx'}")
+    
+    quantize_dynamic(
+        str(out / "model.onnx"),
+        str(out / "model_int8.onnx"),
+        weight_type=QuantType.QInt8
+    )
+    print(f"Quantized model written to {out / 'model_int8.onnx'}")
+
+
+def _cosine(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return (a * b).sum(axis=1)
+
+
+def _parity_texts(limit: int) -> List[str]:
+    """Sample chunks from the docs folder, falling back to built-in sentences."""
+    texts = list(SAMPLE_TEXTS)
+    processor = DocumentProcessor()
+    for doc_path in processor.get_all_documents():
+        if len(texts) >= limit:
+            break
+        try:
+            texts.extend(chunk["text"] for chunk in processor.process_document(doc_path)[:8])
+        except Exception as e:
+            print(f"Skipping {doc_path.name}: {e}")
+    return texts[:limit]
+
+
+def parity(model_dir: str, quantized: bool, min_similarity: float, limit: int) -> bool:
+    """Compare ONNX and PyTorch embeddings; True if every pair is similar enough."""
+    texts = _parity_texts(limit)
+    reference = SentenceTransformerBackend(settings.EMBEDDING_MODEL).encode(texts)
+    onnx = OnnxEmbeddingBackend(
+        model_dir,
+        quantized=quantized,
+        max_length=settings.ONNX_MAX_LENGTH,
+        normalize=settings.ONNX_NORMALIZE
+    ).encode(texts)
+    
+    if reference.shape != onnx.shape:
+        print(f"Shape mismatch: torch {reference.shape} vs onnx {onnx.shape}")
+        return False
+    
+    similarities = _cosine(reference, onnx)
+    print(
+        f"Compared {len(texts)} texts ({'int8' if quantized else 'fp32'}): "
+        f"min cosine {similarities.min():.4f}, mean {similarities.mean():.4f}"
+    )
+    
+    worst = int(similarities.argmin())
+    if similarities[worst] < min_similarity:
+        print(f"Below threshold {min_similarity}: {texts[worst][:80]!r}")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--model-dir", default=settings.ONNX_MODEL_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    export_parser = subparsers.add_parser("export", help="Export and quantize the model")
+    export_parser.add_argument("--model", default=settings.EMBEDDING_MODEL)
+    export_parser.add_argument("--opset", type=int, default=14)
+    
+    parity_parser = subparsers.add_parser("parity", help="Compare ONNX against the torch model")
+    parity_parser.add_argument("--min-similarity", type=float, default=0.99)
+    parity_parser.add_argument("--limit", type=int, default=200)
+    parity_parser.add_argument("--fp32", action="store_true", help="Check the unquantized model")
+    
+    args = parser.parse_args()
+    if args.command == "export":
+        export(args.model_dir, args.model, args.opset)
+    elif not parity(args.model_dir, not args.fp32, args.min_similarity, args.limit):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Export the indexed corpus to a snapshot or import one into Qdrant.
+
+Run from the backend directory with the same environment as the API:
+    
+    python -m scripts.snapshot list
+    python -m scripts.snapshot export [--name NAME]
+    python -m scripts.snapshot import NAME [--force] [--api URL]
+
+Import builds a new versioned collection and switches the collection alias
+to it when complete. With --api the import runs as a job of the running
+API (reading the snapshot from the API's SNAPSHOT_DIR), so it cannot race
+its ingest or reindex jobs and the API picks up the new collection.
+Without --api the import runs in this process: stop the API first, or
+restart it afterwards, since its file registry, caches and local index
+still describe the previous collection.
+"""
+import argparse
+import sys
+import time
+
+import requests
+
+from app.core.config import settings
+from app.services.qdrant_service import QdrantRAGService
+from app.services.snapshots import SnapshotManager
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--snapshot-dir", default=settings.SNAPSHOT_DIR)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    
+    subparsers.add_parser("list", help="List available snapshots")
+    
+    export_parser = subparsers.add_parser("export", help="Write the live collection to a snapshot")
+    export_parser.add_argument("--name", help="Snapshot name (default: <collection>-<timestamp>)")
+    
+    import_parser = subparsers.add_parser("import", help="Load a snapshot and serve it")
+    import_parser.add_argument("name")
+    import_parser.add_argument("--force", action="store_true", help="Ignore an embedding model mismatch")
+    import_parser.add_argument("--api", help="Base URL of the running API to run the import through")
+    
+    args = parser.parse_args()
+    if args.command == "import" and args.api:
+        sys.exit(import_through_api(args.api, args.name, args.force))
+    
+    rag_service = QdrantRAGService(connect=args.command != "list")
+    snapshots = SnapshotManager(rag_service, args.snapshot_dir)
+    
+    if args.command == "list":
+        for snapshot in snapshots.list_snapshots():
+            print(
+                f"{snapshot['name']}\t{snapshot['created_at']}\t"
+                f"{snapshot['points']} points\t{snapshot['files']} files\t{snapshot['embedding_model']}"
+            )
+        return
+    
+    if not rag_service.is_available():
+        print("Qdrant is not reachable; check QDRANT_HOST and QDRANT_PORT", file=sys.stderr)
+        sys.exit(1)
+    
+    try:
+        if args.command == "export":
+            snapshots.export(args.name)
+        else:
+            snapshots.import_snapshot(args.name, force=args.force)
+    except Exception as e:
+        print(f"Snapshot {args.command} failed: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+def import_through_api(api_url: str, name: str, force: bool) -> int:
+    """Start an import job on the API and wait for it; returns the exit code."""
+    api_url = api_url.rstrip("/")
+    response = requests.post(f"{api_url}/snapshots/import", json={"name": name, "force": force}, timeout=30)
+    if response.status_code != 202:
+        print(f"Snapshot import failed: {response.status_code} {response.text}", file=sys.stderr)
+        return 1
+    
+    job_id = response.json()["job_id"]
+    print(f"Import job {job_id} started")
+    while True:
+        time.sleep(2)
+        job = requests.get(f"{api_url}/ingest/jobs/{job_id}", timeout=30).json()
+        if job["status"] not in ("pending", "running"):
+            break
+    
+    if job["status"] != "completed":
+        print(f"Snapshot import failed: {job['error']}", file=sys.stderr)
+        return 1
+    print(f"Imported {job['chunks_ingested']} points")
+    return 0
+
+
+if __name__ == "__main__":
+    main()
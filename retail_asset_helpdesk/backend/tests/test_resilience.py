@@ -0,0 +1,83 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.resilience import CircuitBreaker, CircuitOpenError
+
+
+def _fail():
+    raise ConnectionError("refused")
+
+
+def _open_breaker() -> CircuitBreaker:
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.state == "open"
+    time.sleep(0.06)
+    return breaker
+
+
+def test_opens_after_threshold_and_recovers():
+    breaker = _open_breaker()
+    assert breaker.state == "half_open"
+    assert breaker.call(lambda: "ok") == "ok"
+    assert breaker.state == "closed"
+
+
+def test_bad_request_does_not_open():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    with pytest.raises(ValueError):
+        breaker.call(lambda: int("x"))
+    assert breaker.state == "closed"
+
+
+def test_cancelled_trial_call_releases_half_open():
+    breaker = _open_breaker()
+
+    async def hang():
+        await asyncio.sleep(10)
+
+    async def cancel_trial():
+        task = asyncio.ensure_future(breaker.acall(hang))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+        async def ok():
+            return "ok"
+        return await breaker.acall(ok)
+
+    assert asyncio.run(cancel_trial()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_interrupted_sync_trial_call_releases_half_open():
+    breaker = _open_breaker()
+
+    def interrupted():
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        breaker.call(interrupted)
+    assert breaker.call(lambda: "ok") == "ok"
+
+
+def test_open_circuit_fails_fast():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=30)
+    with pytest.raises(ConnectionError):
+        breaker.call(_fail)
+    with pytest.raises(CircuitOpenError):
+        breaker.call(lambda: "ok")
+
+
+def test_disabled_breaker_never_opens():
+    breaker = CircuitBreaker("test", failure_threshold=0, reset_timeout=30)
+    for _ in range(3):
+        with pytest.raises(ConnectionError):
+            breaker.call(_fail)
+    assert breaker.state == "closed"
+    assert breaker.times_opened == 0
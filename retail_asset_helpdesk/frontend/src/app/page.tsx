@@ -51,7 +51,12 @@ export default function Home() {
   const handleIngest = async () => {
     setIsIngesting(true);
     try {
-      await api.ingestDocuments();
+      // Ingestion runs as a background job; poll until it finishes
+      let job = await api.ingestDocuments();
+      while (job.status === 'pending' || job.status === 'running') {
+        await new Promise((resolve) => setTimeout(resolve, 2000));
+        job = await api.getIngestJob(job.job_id);
+      }
       await loadIngestStatus();
     } catch (error) {
       console.error('Failed to ingest:', error);
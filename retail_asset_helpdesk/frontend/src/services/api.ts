@@ -1,4 +1,4 @@
-import { IngestStatus, QueryResponse, Asset, AssetStats } from '@/types';
+import { IngestStatus, IngestJob, QueryResponse, Asset, AssetStats } from '@/types';
 
 const API_BASE_URL = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000';
 
@@ -50,8 +50,12 @@ class ApiClient {
   // Document/RAG Endpoints
   // ==================
 
-  async ingestDocuments(): Promise<{ message: string; files_processed: number }> {
-    return this.request('/ingest', { method: 'POST' });
+  async ingestDocuments(): Promise<IngestJob> {
+    return this.request<IngestJob>('/ingest', { method: 'POST' });
+  }
+
+  async getIngestJob(jobId: string): Promise<IngestJob> {
+    return this.request<IngestJob>(`/ingest/jobs/${jobId}`);
   }
 
   async getIngestStatus(): Promise<IngestStatus> {
@@ -108,6 +108,19 @@ export interface IngestStatus {
   }>;
 }
 
+export interface IngestJob {
+  job_id: string;
+  kind: string;
+  status: 'pending' | 'running' | 'completed' | 'failed';
+  files_total: number;
+  files_done: number;
+  chunks_embedded: number;
+  chunks_ingested: number;
+  eta_seconds?: number | null;
+  errors: string[];
+  error?: string | null;
+}
+
 export interface QueryResponse {
   answer: string;
   sources: Source[];